@@ -1,97 +1,620 @@
-from flask import Flask, request, jsonify, send_file, url_for
+from flask import Flask, Response, request, jsonify, send_file, url_for, stream_with_context, has_request_context
 import uuid
 import os
+import json
+import time
+import threading
 import multiprocessing
-from main_generator import generate_video_from_drive  # Must accept 3 args: folder_id, title, output_path
+from concurrent.futures import ThreadPoolExecutor, wait
+from main_generator import generate_video_from_drive  # Must accept folder_id, title, output_path, task_path
+from transcription_service import start_transcription_service
+from transcription_engines import DEFAULT_ENGINE, parse_engine_spec
+from render_queue import RenderQueue, QueueFull
+from task_store import get_task_store, MAX_ATTEMPTS
+from webhooks import send_callback, is_valid_callback_url
+from render_cache import RenderCache, render_key, render_settings, request_key
+from render_style import default_seed, resolve_render_style
+from renditions import RENDITIONS, parse_renditions, rendition_path
+import metrics
 from flask_cors import CORS
 from waitress import serve
 
 app = Flask(__name__)
 CORS(app)
+# Behind Apache/lighttpd, let the front server stream files (X-Sendfile)
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "0") == "1"
+# Behind nginx, hand downloads to an internal location mapped onto TASK_FOLDER
+X_ACCEL_PREFIX = os.environ.get("X_ACCEL_PREFIX")
 
 TASK_FOLDER = "tasks"
 os.makedirs(TASK_FOLDER, exist_ok=True)
 
-def generate_video_task(folder_id, title, task_id):
+RENDER_BACKENDS = ("moviepy", "ffmpeg", "segments")
+CAPTION_MODES = ("clips", "ass")
+TERMINAL_STATES = ("done", "error")
+STATUS_MAX_WAIT = float(os.environ.get("STATUS_MAX_WAIT", "120"))  # Longest /status long-poll
+STATUS_POLL_INTERVAL = 0.5  # How often waiters re-read progress written by workers
+SSE_HEARTBEAT = 15
+BATCH_MAX_JOBS = int(os.environ.get("BATCH_MAX_JOBS", "50"))
+CACHE_LOOKUP_TIMEOUT = float(os.environ.get("CACHE_LOOKUP_TIMEOUT", "10"))  # Longest wait for a Drive listing in /start
+
+# Notified when a render finishes, so waiters don't sit out a poll interval
+task_events = threading.Condition()
+# Serializes the duplicate check and task creation in /start
+start_lock = threading.Lock()
+# Drive listings for render cache lookups, kept off the request threads
+cache_lookups = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("CACHE_LOOKUP_WORKERS", "8")), thread_name_prefix="cache-lookup"
+)
+
+def params_settings(params):
+    engine_spec = ":".join(parse_engine_spec(params["transcription_engine"] or DEFAULT_ENGINE))
+    return render_settings(params["render_backend"], params["caption_mode"], engine_spec)
+
+def params_render_key(files, params):
+    """Render cache key of a request given its Drive folder listing"""
+    return render_key(
+        files, params["on_video_title"], resolve_render_style(params["seed"]), params_settings(params)
+    )
+
+def generate_video_task(folder_id, title, task_id, render_backend="moviepy", caption_mode="clips",
+                        transcription_engine=None, seed=None, renditions=None, folder_files=None):
     task_path = os.path.join(TASK_FOLDER, task_id)
-    status_file = os.path.join(task_path, "status.txt")
     output_path = os.path.join(task_path, "output.mp4")
+    store = get_task_store()
+    timings = None
+    cache_key = None
+
+    def on_progress(stage, percent, stage_timings):
+        nonlocal timings
+        timings = stage_timings
+        store.progress(task_id, stage, percent, stage_timings)
+
+    def on_assets(files):
+        # Key the result by the assets this render actually downloads
+        nonlocal cache_key
+        cache_key = params_render_key(files, {
+            "on_video_title": title, "seed": seed, "render_backend": render_backend,
+            "caption_mode": caption_mode, "transcription_engine": transcription_engine,
+        })
+        store.set_render_key(task_id, cache_key)
+
+    # Stage observations recorded by this process from here on belong to this task
+    metrics.drain_observations()
 
     try:
-        with open(status_file, "w") as f:
-            f.write("processing")
+        store.start(task_id)
+        os.makedirs(task_path, exist_ok=True)
 
         # Your video generation logic
-        generate_video_from_drive(folder_id, title, output_path, task_path)
+        generate_video_from_drive(
+            folder_id, title, output_path, task_path,
+            render_backend=render_backend, caption_mode=caption_mode,
+            transcription_engine=transcription_engine, on_progress=on_progress,
+            seed=seed, on_assets=on_assets, renditions=renditions, folder_files=folder_files
+        )
+
+        if cache_key:
+            cache = RenderCache()
+            for name in parse_renditions(renditions):
+                cache.store(cache_key, rendition_path(output_path, name), RENDITIONS[name].suffix)
+        store.finish(task_id, output_path, timings, metrics.drain_observations())
+
+    except Exception as e:
+        store.fail(task_id, e, timings, metrics.drain_observations())
+
+    send_task_callback(task_id)
+
+def generate_video_batch(batch_id, task_ids, folder_files=None):
+    """Render a batch's tasks one after another in this (warm) worker process.
+
+    The Whisper engine, fonts, caption sprites, Drive session and image-prep
+    pool are per-process and loaded once, so every short after the first
+    skips those startup costs. folder_files maps task ids to the Drive
+    listings /start_batch already fetched.
+    """
+    folder_files = folder_files or {}
+    store = get_task_store()
+    for task_id in task_ids:
+        task = store.get(task_id)
+        if task is None or task["state"] in TERMINAL_STATES:
+            continue
+        params = task["params"]
+        print(f"Batch {batch_id}: rendering {task_id} ({params['on_video_title']})")
+        generate_video_task(
+            params["folder_id"], params["on_video_title"], task_id,
+            params["render_backend"], params["caption_mode"], params["transcription_engine"],
+            params.get("seed"), params.get("renditions"), folder_files.get(task_id)
+        )
+
+def send_task_callback(task_id):
+    # Sent by whichever process finalizes the task
+    task = get_task_store().get(task_id)
+    callback_url = task["params"].get("callback_url") if task else None
+    if callback_url:
+        send_callback(callback_url, task_status(task))
+
+def mark_crashed(queue_id, error):
+    # A dying worker breaks the whole pool, so this runs for every job that was
+    # running then, not only the one that crashed. Each unfinished task goes back
+    # in the queue until it has used up MAX_ATTEMPTS; a task that keeps killing
+    # its worker fails once it gets there.
+    store = get_task_store()
+    task = store.get(queue_id)
+    is_batch = task is None
+    tasks = store.batch_tasks(queue_id) if is_batch else [task]
+    retry = []
+    for task in tasks:
+        if task["state"] in TERMINAL_STATES:
+            continue
+        if task["attempts"] >= MAX_ATTEMPTS:
+            store.fail(task["task_id"], f"render worker crashed ({error}) after {task['attempts']} attempts")
+            send_task_callback(task["task_id"])
+        else:
+            store.requeue(task["task_id"])
+            retry.append(task)
+    if not retry:
+        return
+
+    print(f"Requeueing {len(retry)} task(s) interrupted by a render worker crash ({error})")
+    try:
+        if is_batch:
+            render_queue.submit(
+                queue_id, generate_video_batch, queue_id, [task["task_id"] for task in retry],
+                priority=retry[0]["priority"]
+            )
+        else:
+            enqueue_task(retry[0]["task_id"], retry[0]["params"], retry[0]["priority"])
+    except QueueFull:
+        for task in retry:
+            store.fail(task["task_id"], f"render worker crashed ({error}) and the queue is full")
+            send_task_callback(task["task_id"])
+
+def task_finished(queue_id):
+    with task_events:
+        task_events.notify_all()
+
+    store = get_task_store()
+    task = store.get(queue_id)
+    for task in [task] if task is not None else store.batch_tasks(queue_id):
+        if task["state"] in TERMINAL_STATES:
+            metrics.observe_task(task)
 
-        with open(status_file, "w") as f:
-            f.write("done")
+# Fixed pool of render workers; extra requests wait in a bounded queue
+render_queue = RenderQueue(on_crash=mark_crashed, on_finish=task_finished)
 
+def enqueue_task(task_id, params, priority=0, folder_files=None):
+    render_queue.submit(
+        task_id, generate_video_task,
+        params["folder_id"], params["on_video_title"], task_id,
+        params["render_backend"], params["caption_mode"], params["transcription_engine"],
+        params.get("seed"), params.get("renditions"), folder_files,
+        priority=priority
+    )
+
+def lookup_cached_render(params):
+    """(Drive listing, (render key, {rendition: cached path}) or None) for a request.
+
+    The listing is None if the folder could not be listed; the render then lists it itself.
+    """
+    try:
+        from drive_download import DriveDownloader
+        from drive_auth import get_drive_session
+        files = DriveDownloader(get_drive_session()).list_folder(params["folder_id"])
     except Exception as e:
-        with open(status_file, "w") as f:
-            f.write(f"error: {str(e)}")
+        print(f"Skipping render cache lookup, could not list Drive folder: {e}")
+        return None, None
+    key = params_render_key(files, params)
+    cache = RenderCache()
+    cached = {}
+    for name in parse_renditions(params.get("renditions")):
+        cached[name] = cache.lookup(key, RENDITIONS[name].suffix)
+        if cached[name] is None:
+            return files, None
+    return files, (key, cached)
+
+def lookup_cached_renders(job_list):
+    """lookup_cached_render for each job on the lookup threads, waiting at most CACHE_LOOKUP_TIMEOUT"""
+    futures = [cache_lookups.submit(lookup_cached_render, params) for params in job_list]
+    done, _ = wait(futures, timeout=CACHE_LOOKUP_TIMEOUT)
+    # A job whose listing is late renders normally and lists the folder itself
+    return [future.result() if future in done else (None, None) for future in futures]
+
+def create_cached_task(task_id, params, priority, key, cached, batch_id=None):
+    """A task that is done on creation, its outputs linked from the render cache; False if they went away"""
+    cache_key, cached_paths = cached
+    output_path = os.path.join(TASK_FOLDER, task_id, "output.mp4")
+    try:
+        for name, cached_path in cached_paths.items():
+            RenderCache.link_into(cached_path, rendition_path(output_path, name))
+    except OSError as e:
+        # Evicted between lookup and link; render it instead
+        print(f"Cached render {cache_key} went away ({e}), rendering instead")
+        return False
+    store = get_task_store()
+    store.create(task_id, params, priority, request_key=key, batch_id=batch_id)
+    store.set_render_key(task_id, cache_key)
+    store.finish(task_id, output_path, metrics={"cached": True})
+    task_finished(task_id)
+    send_task_callback(task_id)
+    return True
+
+def recover_tasks():
+    """Requeue tasks left queued or processing by a previous run of the server"""
+    store = get_task_store()
+    for task in store.unfinished():
+        if task["attempts"] >= MAX_ATTEMPTS:
+            store.fail(task["task_id"], f"abandoned after {task['attempts']} interrupted attempts")
+            send_task_callback(task["task_id"])
+            continue
+        print(f"Requeueing interrupted task {task['task_id']} ({task['state']})")
+        store.requeue(task["task_id"])
+        try:
+            enqueue_task(task["task_id"], task["params"], task["priority"])
+        except QueueFull:
+            store.fail(task["task_id"], "render queue full while recovering interrupted task")
+            send_task_callback(task["task_id"])
+
+def download_url_for(task, rendition=None):
+    task_id = task["task_id"]
+    if has_request_context():
+        return url_for("download_file", task_id=task_id, rendition=rendition, _external=True)
+    # Webhooks are sent outside any request; use the host /start was called on
+    url = f"{task['params'].get('base_url', '/').rstrip('/')}/download/{task_id}"
+    return f"{url}?rendition={rendition}" if rendition else url
+
+def task_status(task):
+    """Public /status view of a task row"""
+    task_id = task["task_id"]
+    state = task["state"]
+    if state == "done":
+        status = {
+            "status": "done",
+            "task_id": task_id,
+            "download_url": download_url_for(task),
+            "timings": task["timings"]
+        }
+        if (task["metrics"] or {}).get("cached"):
+            status["cached"] = True
+        renditions = parse_renditions(task["params"].get("renditions"))
+        if len(renditions) > 1:
+            status["renditions"] = {name: download_url_for(task, name) for name in renditions}
+    elif state == "error":
+        status = {"status": "error", "task_id": task_id, "message": f"error: {task['error']}"}
+    elif state == "queued":
+        # Batch items wait in the queue under their batch id
+        position = render_queue.position(task_id)
+        if position is None and task["batch_id"]:
+            position = render_queue.position(task["batch_id"])
+        status = {"task_id": task_id, "status": "queued", "queue_position": position}
+    else:
+        status = {
+            "task_id": task_id,
+            "status": "processing",
+            "stage": task["stage"],
+            "percent": task["percent"]
+        }
+    status["updated_at"] = task["updated_at"]
+    return status
+
+def wait_for_task(task_id, timeout, since=None):
+    """Task row once it finishes (or changes after `since`), or when timeout runs out"""
+    store = get_task_store()
+    deadline = time.monotonic() + timeout
+    while True:
+        task = store.get(task_id)
+        if task is None or task["state"] in TERMINAL_STATES:
+            return task
+        if since is not None and task["updated_at"] > since:
+            return task
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return task
+        with task_events:
+            task_events.wait(min(STATUS_POLL_INTERVAL, remaining))
+
+def queue_full_response(error):
+    response = jsonify({"error": "Render queue is full", "retry_after": error.retry_after})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 429
+
+def render_options(data):
+    """Validated render options shared by /start and /start_batch, or (None, error)"""
+    options = {
+        "render_backend": data.get("render_backend", "moviepy"),
+        "caption_mode": data.get("caption_mode", "clips"),
+        "transcription_engine": data.get("transcription_engine"),
+        "priority": data.get("priority", 0),
+        "callback_url": data.get("callback_url"),
+        "renditions": data.get("renditions"),
+    }
+
+    if options["render_backend"] not in RENDER_BACKENDS:
+        return None, f"Unknown 'render_backend', expected one of {', '.join(RENDER_BACKENDS)}"
+
+    if options["caption_mode"] not in CAPTION_MODES:
+        return None, f"Unknown 'caption_mode', expected one of {', '.join(CAPTION_MODES)}"
+
+    if options["transcription_engine"]:
+        try:
+            parse_engine_spec(options["transcription_engine"])
+        except ValueError as e:
+            return None, str(e)
+
+    if not isinstance(options["priority"], int):
+        return None, "'priority' must be an integer"
+
+    if options["callback_url"] and not is_valid_callback_url(options["callback_url"]):
+        return None, "'callback_url' must be an http(s) URL on a public host or one in CALLBACK_ALLOWED_HOSTS"
+
+    if options["renditions"] is not None:
+        try:
+            options["renditions"] = parse_renditions(options["renditions"])
+        except ValueError as e:
+            return None, str(e)
+
+    return options, None
+
+def job_params(job, options):
+    """Task params for one folder/title job, or (None, error)"""
+    folder_id = job.get("folder_id")
+    on_video_title = job.get("on_video_title")
+    seed = job.get("seed")
+
+    if not folder_id or not on_video_title:
+        return None, "Missing 'folder_id' or 'on_video_title'"
+
+    if seed is not None and not isinstance(seed, int):
+        return None, "'seed' must be an integer"
+
+    params = {
+        "folder_id": folder_id,
+        "on_video_title": on_video_title,
+        "render_backend": options["render_backend"],
+        "caption_mode": options["caption_mode"],
+        "transcription_engine": options["transcription_engine"],
+        "seed": seed if seed is not None else default_seed(folder_id, on_video_title),
+        "callback_url": options["callback_url"],
+        "renditions": options["renditions"],
+        "base_url": request.host_url
+    }
+    return params, None
+
+def params_request_key(params):
+    # Renditions share one render key, but a duplicate only attaches if it wants the same files
+    settings = dict(params_settings(params), renditions=parse_renditions(params.get("renditions")))
+    return request_key(params["folder_id"], params["on_video_title"], params["seed"], settings)
 
 @app.route("/start", methods=["POST"])
 def start_task():
     data = request.get_json()
-    folder_id = data.get("folder_id")
-    on_video_title = data.get("on_video_title")
+    options, error = render_options(data)
+    if error is None:
+        params, error = job_params(data, options)
+    if error is not None:
+        return jsonify({"error": error}), 400
 
-    if not folder_id or not on_video_title:
-        return jsonify({"error": "Missing 'folder_id' or 'on_video_title'"}), 400
+    priority = options["priority"]
+    key = params_request_key(params)
 
-    task_id = str(uuid.uuid4())
-    task_path = os.path.join(TASK_FOLDER, task_id)
-    os.makedirs(task_path, exist_ok=True)
+    store = get_task_store()
+    active = store.find_active(key)
+    if active is not None:
+        # A retry of a request that is still rendering attaches to that task
+        return jsonify(dict(task_status(active), attached=True))
 
-    process = multiprocessing.Process(
-        target=generate_video_task,
-        args=(folder_id, on_video_title, task_id)
-    )
-    process.start()
+    # Outside start_lock, so a slow Drive listing holds up no other request
+    [(folder_files, cached)] = lookup_cached_renders([params])
+
+    with start_lock:
+        active = store.find_active(key)
+        if active is not None:
+            return jsonify(dict(task_status(active), attached=True))
+
+        task_id = str(uuid.uuid4())
+        # Same assets, title, style and settings were rendered before: done
+        # without a worker, and never refused by admission control
+        if cached is not None and create_cached_task(task_id, params, priority, key, cached):
+            return jsonify(task_status(store.get(task_id)))
+
+        store.create(task_id, params, priority, request_key=key)
+        try:
+            enqueue_task(task_id, params, priority, folder_files)
+        except QueueFull as e:
+            store.delete(task_id)
+            return queue_full_response(e)
+
+    position = render_queue.position(task_id)
+    if position is None:
+        return jsonify({"task_id": task_id, "status": "started"})
+    return jsonify({"task_id": task_id, "status": "queued", "queue_position": position})
+
+@app.route("/start_batch", methods=["POST"])
+def start_batch():
+    """Queue many folder/title jobs to run back to back in one warm worker"""
+    data = request.get_json()
+    jobs = data.get("jobs")
+
+    if not isinstance(jobs, list) or not jobs:
+        return jsonify({"error": "'jobs' must be a non-empty list"}), 400
+
+    if len(jobs) > BATCH_MAX_JOBS:
+        return jsonify({"error": f"At most {BATCH_MAX_JOBS} jobs per batch"}), 400
+
+    options, error = render_options(data)
+    if error is not None:
+        return jsonify({"error": error}), 400
 
-    return jsonify({"task_id": task_id, "status": "started"})
+    job_list = []
+    for index, job in enumerate(jobs):
+        params, error = job_params(job if isinstance(job, dict) else {}, options)
+        if error is not None:
+            return jsonify({"error": f"jobs[{index}]: {error}"}), 400
+        job_list.append(params)
+
+    priority = options["priority"]
+    batch_id = str(uuid.uuid4())
+    statuses = [None] * len(job_list)
+    lookups = lookup_cached_renders(job_list)
+    to_render = [
+        (index, params, params_request_key(params), lookups[index]) for index, params in enumerate(job_list)
+    ]
+
+    store = get_task_store()
+    with start_lock:
+        task_ids = []
+        folder_files = {}
+        for index, params, key, (files, cached) in to_render:
+            # Also catches the same job listed twice in this batch
+            active = store.find_active(key)
+            if active is not None:
+                statuses[index] = dict(task_status(active), attached=True)
+                continue
+            task_id = str(uuid.uuid4())
+            if cached is not None and create_cached_task(task_id, params, priority, key, cached, batch_id):
+                statuses[index] = task_status(store.get(task_id))
+                continue
+            store.create(task_id, params, priority, request_key=key, batch_id=batch_id)
+            task_ids.append(task_id)
+            folder_files[task_id] = files
+            statuses[index] = {"task_id": task_id, "status": "queued"}
+
+        if task_ids:
+            try:
+                render_queue.submit(
+                    batch_id, generate_video_batch, batch_id, task_ids, folder_files, priority=priority
+                )
+            except QueueFull as e:
+                for task_id in task_ids:
+                    store.delete(task_id)
+                return queue_full_response(e)
+
+    return jsonify({"batch_id": batch_id, "tasks": statuses})
 
 @app.route("/status", methods=["POST"])
 def check_status():
     data = request.get_json()
     task_id = data.get("task_id")
+    task_ids = data.get("task_ids")
+
+    if task_ids is not None:
+        # Bulk form: one query for many tasks; unknown ids map to null
+        if not isinstance(task_ids, list) or not all(isinstance(task_id, str) for task_id in task_ids):
+            return jsonify({"error": "'task_ids' must be a list of strings"}), 400
+        tasks = get_task_store().get_many(task_ids)
+        return jsonify({"tasks": {
+            task_id: task_status(tasks[task_id]) if task_id in tasks else None
+            for task_id in task_ids
+        }})
 
     if not task_id:
         return jsonify({"error": "Missing 'task_id'"}), 400
 
-    task_path = os.path.join(TASK_FOLDER, task_id)
-    status_file = os.path.join(task_path, "status.txt")
-    output_file = os.path.join(task_path, "output.mp4")
+    # Long-poll: "wait" holds the request until the task finishes (or, with
+    # "since", until its status changes after that updated_at) or time runs out
+    try:
+        wait = min(float(data.get("wait", 0)), STATUS_MAX_WAIT)
+        since = data.get("since")
+        since = float(since) if since is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'wait' and 'since' must be numbers"}), 400
 
-    if not os.path.exists(status_file):
+    if wait > 0:
+        task = wait_for_task(task_id, wait, since)
+    else:
+        task = get_task_store().get(task_id)
+    if task is None:
         return jsonify({"error": "Invalid task_id"}), 404
 
-    with open(status_file, "r") as f:
-        status = f.read().strip()
+    return jsonify(task_status(task))
 
-    if status == "done":
-        download_url = url_for("download_file", task_id=task_id, _external=True)
-        return jsonify({
-            "status": "done",
-            "task_id": task_id,
-            "download_url": download_url
-        })
-    elif status.startswith("error"):
-        return jsonify({"status": "error", "message": status})
-    else:
-        return jsonify({"task_id": task_id, "status": "processing"})
+@app.route("/status/<task_id>/stream", methods=["GET"])
+def stream_status(task_id):
+    """Server-Sent Events: a "progress" event per change, then "done" or "error" """
+    if get_task_store().get(task_id) is None:
+        return jsonify({"error": "Invalid task_id"}), 404
+
+    def events():
+        since = None
+        task = get_task_store().get(task_id)
+        while task is not None:
+            if since is None or task["updated_at"] > since:
+                since = task["updated_at"]
+                event = task["state"] if task["state"] in TERMINAL_STATES else "progress"
+                yield f"event: {event}\ndata: {json.dumps(task_status(task))}\n\n"
+                if task["state"] in TERMINAL_STATES:
+                    return
+            else:
+                yield ": keep-alive\n\n"
+            task = wait_for_task(task_id, SSE_HEARTBEAT, since)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def collect_runtime_metrics():
+    stats = render_queue.stats()
+    metrics.QUEUE_DEPTH.set(stats["queued"])
+    metrics.ACTIVE_WORKERS.set(stats["active"])
+    metrics.WORKERS.set(stats["workers"])
+    worker_rss = {}
+    for pid in render_queue.worker_pids():
+        rss = metrics.process_rss(pid)
+        if rss is not None:
+            worker_rss[(pid,)] = rss
+    metrics.WORKER_RSS.replace(worker_rss)
+    rss = metrics.process_rss()
+    if rss is not None:
+        metrics.PROCESS_RSS.set(rss)
+
+metrics.REGISTRY.add_collector(collect_runtime_metrics)
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route("/download/<task_id>", methods=["GET"])
 def download_file(task_id):
-    task_path = os.path.join(TASK_FOLDER, task_id)
-    output_file = os.path.join(task_path, "output.mp4")
+    task = get_task_store().get(task_id)
+    output_file = task["output_path"] if task else None
+
+    # ?rendition=master|preview|thumbnail picks one of the task's extra outputs
+    rendition = request.args.get("rendition", "short")
+    if rendition not in RENDITIONS:
+        return jsonify({"status": "error", "message": f"Unknown rendition '{rendition}'"}), 400
+    if output_file and rendition not in parse_renditions(task["params"].get("renditions")):
+        return jsonify({"status": "error", "message": f"Rendition '{rendition}' was not requested"}), 404
+    if output_file:
+        output_file = rendition_path(output_file, rendition)
+    mimetype = RENDITIONS[rendition].mimetype
 
-    if os.path.exists(output_file):
-        return send_file(output_file, as_attachment=True)
+    if output_file and os.path.exists(output_file):
+        if X_ACCEL_PREFIX:
+            # nginx serves the bytes with sendfile, Range and ETag handling
+            relative = os.path.relpath(output_file, TASK_FOLDER).replace(os.sep, "/")
+            response = Response(mimetype=mimetype)
+            response.headers["X-Accel-Redirect"] = f"{X_ACCEL_PREFIX.rstrip('/')}/{relative}"
+            response.headers["Content-Disposition"] = f"attachment; filename={os.path.basename(output_file)}"
+            return response
+        # Range requests (206), ETag/If-None-Match and Last-Modified are handled
+        # by send_file; waitress streams the file through wsgi.file_wrapper
+        return send_file(
+            os.path.abspath(output_file),
+            mimetype=mimetype,
+            as_attachment=True,
+            conditional=True,
+            etag=True,
+            max_age=3600
+        )
     else:
         return jsonify({"status": "error", "message": "File not found"}), 404
 
 if __name__ == "__main__":
     multiprocessing.set_start_method("spawn")
-    serve(app, host='0.0.0.0', port=8000)
+    if os.environ.get("TRANSCRIBE_SERVICE", "1") != "0":
+        start_transcription_service()
+    recover_tasks()
+    # Long-polls and event streams each hold a thread while they wait
+    serve(app, host='0.0.0.0', port=8000, threads=int(os.environ.get("WAITRESS_THREADS", "32")))
@@ -0,0 +1,115 @@
+"""
+Asset Cache for Video Generator
+===============================
+
+Host-wide, content-addressed store of downloaded Drive files. Blobs are keyed
+by the md5Checksum Drive reports in files().list (or by file id and
+modifiedTime for files without a checksum), so a retry or re-render of the
+same folder links the cached blobs into its task directory instead of
+downloading them again.
+
+Blobs are hardlinked into place (copied if the task directory is on another
+filesystem). The cache is trimmed least-recently-used to a size cap.
+
+Usage:
+    from asset_cache import AssetCache
+
+    cache = AssetCache()
+    blob = cache.lookup(drive_file)
+    if blob is None:
+        download(drive_file, cache.temp_path(drive_file))
+        blob = cache.store(drive_file, cache.temp_path(drive_file))
+    cache.link_into(blob, out_path)
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+
+from lru_eviction import evict_lru
+
+DEFAULT_CACHE_DIR = os.environ.get("ASSET_CACHE_DIR", "asset_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("ASSET_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+
+def md5_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetCache:
+    """Content-addressed blob store for Drive files with LRU eviction"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(file):
+        """Cache key of a files().list entry"""
+        checksum = file.get("md5Checksum")
+        if checksum:
+            return checksum
+        return "id_" + hashlib.sha1(f"{file['id']}:{file.get('modifiedTime', '')}".encode()).hexdigest()
+
+    def blob_path(self, file):
+        key = self.key_for(file)
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def temp_path(self, file):
+        """Where to download a missing blob before store() moves it in"""
+        path = self.blob_path(file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.download"
+
+    def lookup(self, file):
+        """Cached blob path for a Drive file, or None"""
+        path = self.blob_path(file)
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path, None)  # Mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def store(self, file, downloaded_path):
+        """Move a finished download into the cache after checking its checksum"""
+        checksum = file.get("md5Checksum")
+        if checksum and md5_file(downloaded_path) != checksum:
+            os.remove(downloaded_path)
+            raise IOError(f"Checksum mismatch for Drive file {file['id']} ({file.get('name')})")
+
+        path = self.blob_path(file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(downloaded_path, path)
+        self.evict()
+        return path
+
+    @staticmethod
+    def link_into(blob_path, out_path):
+        """Hardlink a blob to out_path, falling back to a copy"""
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        try:
+            os.link(blob_path, out_path)
+        except OSError:
+            shutil.copyfile(blob_path, out_path)
+        return out_path
+
+    def evict(self):
+        """Remove least recently used blobs until the cache is under max_bytes"""
+        # ".download" files are in-flight downloads of another task
+        evict_lru(self.cache_dir, self.max_bytes, skip=lambda name: ".download" in name)
@@ -0,0 +1,7 @@
+"""
+Offline benchmarks for the video generator.
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.transcription --corpus path/to/corpus
+    python -m benchmarks.render --durations 30 60 90 --json render_results.json
+"""
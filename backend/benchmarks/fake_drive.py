@@ -0,0 +1,159 @@
+"""
+Local Drive Stand-in
+====================
+
+Serves local folders through the two Drive v3 REST calls DriveDownloader
+makes, so renders can be benchmarked without network access or credentials:
+
+    GET /files?q='<folder_id>' in parents and trashed = false&pageSize=..&pageToken=..
+    GET /files/<file_id>?alt=media
+
+Each subdirectory of the root is a Drive folder whose id is the directory
+name. Listings are paged like Drive's and carry md5Checksum, size and
+modifiedTime, so the asset cache behaves as it does in production.
+
+Usage:
+    from benchmarks.fake_drive import FakeDrive
+
+    with FakeDrive("bench/fixtures") as drive:
+        downloader = DriveDownloader(requests.Session(), api_base=drive.api_base)
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+MIME_TYPES = {".png": "image/png", ".mp3": "audio/mpeg"}
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_id_for(folder_id, name):
+    return hashlib.sha1(f"{folder_id}/{name}".encode()).hexdigest()[:20]
+
+
+def md5_file(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FakeDrive:
+    """Threaded HTTP server answering files().list and get_media for root's subfolders"""
+
+    def __init__(self, root, host="127.0.0.1", port=0):
+        self.root = root
+        self._files = {}  # file_id -> path, filled in as folders are listed
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_base(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def list_folder(self, folder_id):
+        """Drive file resources for the files in root/folder_id"""
+        folder = os.path.join(self.root, folder_id)
+        if not os.path.isdir(folder):
+            return []
+        files = []
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            file_id = file_id_for(folder_id, name)
+            with self._lock:
+                self._files[file_id] = path
+            files.append({
+                "id": file_id,
+                "name": name,
+                "mimeType": MIME_TYPES.get(os.path.splitext(name)[1].lower(), "application/octet-stream"),
+                "md5Checksum": md5_file(path),
+                "size": str(stat.st_size),
+                "modifiedTime": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+            })
+        return files
+
+    def media_path(self, file_id):
+        with self._lock:
+            return self._files.get(file_id)
+
+    def _handler_class(self):
+        drive = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == "/files":
+                    self._list(params)
+                elif url.path.startswith("/files/") and params.get("alt") == "media":
+                    self._media(url.path[len("/files/"):])
+                else:
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+            def _list(self, params):
+                match = re.search(r"'([^']+)' in parents", params.get("q", ""))
+                if not match:
+                    self._send_json(400, {"error": {"code": 400, "message": "Unsupported query"}})
+                    return
+                files = drive.list_folder(match.group(1))
+                page_size = int(params.get("pageSize", 100))
+                offset = int(params.get("pageToken", 0))
+                page = {"files": files[offset:offset + page_size]}
+                if offset + page_size < len(files):
+                    page["nextPageToken"] = str(offset + page_size)
+                self._send_json(200, page)
+
+            def _media(self, file_id):
+                path = drive.media_path(file_id)
+                if path is None or not os.path.exists(path):
+                    self._send_json(404, {"error": {"code": 404, "message": f"File not found: {file_id}"}})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(os.path.getsize(path)))
+                self.end_headers()
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        self.wfile.write(chunk)
+
+        return Handler
@@ -0,0 +1,115 @@
+"""
+Synthetic Render Fixtures
+=========================
+
+Deterministic inputs for the render benchmark, so results only change when
+the render code does:
+
+- 8 stills (image_1.png ... image_8.png) at 576x1024: gradients with a few
+  shapes drawn from a seeded random.Random
+- a narration MP3 of the requested length: a pitch-wobbling tone gated into
+  syllable-like bursts, made by ffmpeg's aevalsrc with bitexact output
+- canned Whisper segments for that narration, seeded into the TranscriptCache
+  under the audio hash and engine spec, so the benchmark never loads a model
+
+Usage:
+    from benchmarks.fixtures import build_fixture
+
+    fixture = build_fixture("bench/fixtures/short_30s", 30, "whisper:base")
+"""
+
+import os
+import random
+import subprocess
+
+IMAGE_SIZE = (576, 1024)
+IMAGE_COUNT = 8
+SAMPLE_RATE = 24000
+WORDS_PER_SECOND = 2.5
+WORDS_PER_SEGMENT = 9
+
+WORDS = (
+    "the old house at the end of the road was never empty after dark "
+    "something moved behind the curtains every night and nobody who went "
+    "inside came back the same they say you can still hear it breathing"
+).split()
+
+
+def make_stills(folder, seed=0, count=IMAGE_COUNT, size=IMAGE_SIZE):
+    """Write count seeded stills into folder; returns their paths"""
+    from PIL import Image, ImageDraw
+
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    width, height = size
+    paths = []
+    for i in range(1, count + 1):
+        top = [rng.randint(0, 120) for _ in range(3)]
+        bottom = [rng.randint(60, 255) for _ in range(3)]
+        image = Image.new("RGB", size)
+        draw = ImageDraw.Draw(image)
+        for y in range(height):
+            mix = y / (height - 1)
+            draw.line([(0, y), (width, y)], fill=tuple(
+                int(a + (b - a) * mix) for a, b in zip(top, bottom)
+            ))
+        for _ in range(12):
+            x0, y0 = rng.randrange(width), rng.randrange(height)
+            x1, y1 = x0 + rng.randint(20, 240), y0 + rng.randint(20, 240)
+            color = tuple(rng.randint(0, 255) for _ in range(3))
+            if rng.random() < 0.5:
+                draw.ellipse([x0, y0, x1, y1], fill=color)
+            else:
+                draw.rectangle([x0, y0, x1, y1], fill=color)
+
+        path = os.path.join(folder, f"image_{i}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def make_narration(path, duration):
+    """Write a speech-like mono MP3 of duration seconds"""
+    # ~140 Hz voice wobbling in pitch, gated at ~3.5 syllables per second
+    expression = "0.4*sin(2*PI*(140+40*sin(2*PI*0.7*t))*t)*(0.5+0.5*sin(2*PI*3.5*t))"
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"aevalsrc={expression}:s={SAMPLE_RATE}:d={duration}",
+        "-ac", "1", "-c:a", "libmp3lame", "-b:a", "64k",
+        "-map_metadata", "-1", "-fflags", "+bitexact", "-flags:a", "+bitexact",
+        path
+    ], check=True)
+    return path
+
+
+def make_segments(duration, seed=0):
+    """Whisper-style segments covering duration seconds of narration"""
+    rng = random.Random(seed)
+    word_count = int(duration * WORDS_PER_SECOND)
+    segments = []
+    for start_word in range(0, word_count, WORDS_PER_SEGMENT):
+        words = [rng.choice(WORDS) for _ in range(min(WORDS_PER_SEGMENT, word_count - start_word))]
+        start = start_word / WORDS_PER_SECOND
+        end = min(duration, (start_word + len(words)) / WORDS_PER_SECOND)
+        segments.append({
+            "id": len(segments),
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "text": " " + " ".join(words),
+        })
+    return segments
+
+
+def seed_transcript(audio_path, engine_spec, segments):
+    """Store segments as the transcript of audio_path for engine_spec"""
+    from transcript_cache import TranscriptCache, hash_file
+
+    TranscriptCache().put(hash_file(audio_path), engine_spec, segments)
+
+
+def build_fixture(folder, duration, engine_spec, seed=0):
+    """Stills, narration.mp3 and a seeded transcript in folder"""
+    stills = make_stills(folder, seed=seed)
+    audio_path = make_narration(os.path.join(folder, "narration.mp3"), duration)
+    seed_transcript(audio_path, engine_spec, make_segments(duration, seed=seed))
+    return {"folder": folder, "duration": duration, "stills": stills, "audio": audio_path}
@@ -0,0 +1,209 @@
+"""
+Render Benchmark
+================
+
+Runs generate_video_from_drive end to end on synthetic fixtures, so changes
+to the render path can be compared across commits without Drive credentials,
+network access or a Whisper model:
+
+- benchmarks.fixtures writes 8 stills, a narration MP3 per duration and a
+  canned transcript seeded into the transcript cache
+- benchmarks.fake_drive serves the fixtures through the Drive v3 REST calls;
+  DriveDownloader talks to it over a plain requests.Session
+- each duration renders in a fresh spawned process with empty asset and
+  sprite caches, so every run downloads, prepares and encodes from scratch
+
+Reported per duration:
+- wall seconds of the whole render and of each stage (timings.json)
+- encode fps: output frames per second of encode wall time
+- peak RSS of the render process and of its largest child (ffmpeg, workers)
+- output size
+
+Results go to a JSON file tagged with the git commit; pass an earlier file as
+--baseline to print the change against it.
+
+Usage (from the backend directory):
+    python -m benchmarks.render --durations 30 60 90 \\
+        --backend moviepy --caption-mode clips --json render_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import subprocess
+import multiprocessing
+
+BENCH_TITLE = "The House At The End Of The Road"
+BENCH_SEED = 0
+
+
+def git_commit():
+    """(short commit hash, dirty) of the working tree, or (None, None)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def max_rss_bytes(who):
+    """Peak resident set size from getrusage, in bytes"""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(folder_id, run_dir, render_backend, caption_mode, engine_spec, results):
+    """Child process: render one fixture folder and put its measurements on results"""
+    import requests
+    import drive_auth
+    from metrics import drain_observations
+    from main_generator import generate_video_from_drive
+
+    # The fake Drive needs no credentials
+    session = requests.Session()
+    drive_auth.get_drive_session = lambda: session
+
+    output_file = os.path.join(run_dir, "output.mp4")
+    timings = {}
+
+    def on_progress(stage, percent, stage_timings):
+        timings.update(stage_timings)
+
+    start = time.perf_counter()
+    generate_video_from_drive(
+        folder_id, BENCH_TITLE, output_file, run_dir,
+        render_backend=render_backend, caption_mode=caption_mode,
+        transcription_engine=engine_spec, on_progress=on_progress, seed=BENCH_SEED
+    )
+    wall_seconds = time.perf_counter() - start
+
+    observations = drain_observations()
+    encode_fps = [fps for _, fps in observations["encode_fps"]]
+    results.put({
+        "wall_seconds": round(wall_seconds, 3),
+        "stages": {name: timing["seconds"] for name, timing in timings.items()},
+        "substages": observations["stages"],
+        "encode_fps": encode_fps[-1] if encode_fps else None,
+        "peak_rss_bytes": max_rss_bytes(resource.RUSAGE_SELF),
+        "peak_child_rss_bytes": max_rss_bytes(resource.RUSAGE_CHILDREN),
+        "output_bytes": os.path.getsize(output_file),
+    })
+
+
+def benchmark_duration(duration, args, context):
+    folder_id = f"short_{duration}s"
+    run_dir = os.path.join(args.work_dir, "runs", folder_id)
+    # Cold caches, so every duration pays for downloads and caption sprites
+    for cache_dir in (run_dir, os.environ["ASSET_CACHE_DIR"], os.environ["CAPTION_SPRITE_CACHE_DIR"]):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+
+    results = context.Queue()
+    process = context.Process(
+        target=run_case,
+        args=(folder_id, run_dir, args.backend, args.caption_mode, args.engine, results)
+    )
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise SystemExit(f"Render of {folder_id} failed (exit code {process.exitcode})")
+
+    result = results.get()
+    result["duration"] = duration
+    if not args.keep_outputs:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return result
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {result["duration"]: result for result in baseline["results"]}
+    print(f"\nAgainst {baseline_path} (commit {baseline.get('commit')}):")
+    for result in results:
+        before = previous.get(result["duration"])
+        if before is None:
+            continue
+        change = (result["wall_seconds"] - before["wall_seconds"]) / before["wall_seconds"] * 100
+        print(f"  {result['duration']:>4}s  wall {before['wall_seconds']:.2f} -> "
+              f"{result['wall_seconds']:.2f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end renders on synthetic fixtures")
+    parser.add_argument("--durations", nargs="+", type=int, default=[30, 60, 90], help="Narration lengths in seconds")
+    parser.add_argument("--backend", default="moviepy", choices=["moviepy", "ffmpeg", "segments"])
+    parser.add_argument("--caption-mode", default="clips", choices=["clips", "ass"])
+    parser.add_argument("--engine", default="whisper:base", help="Engine spec the canned transcript is stored under")
+    parser.add_argument("--work-dir", default="bench", help="Fixtures, caches and outputs go here")
+    parser.add_argument("--keep-outputs", action="store_true", help="Keep each run's output.mp4")
+    parser.add_argument("--baseline", default=None, help="Earlier --json results to compare against")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    # Caches are read from the environment at import, so set them before anything loads
+    work_dir = os.path.abspath(args.work_dir)
+    args.work_dir = work_dir
+    os.environ["TRANSCRIPT_CACHE_DIR"] = os.path.join(work_dir, "transcript_cache")
+    os.environ["ASSET_CACHE_DIR"] = os.path.join(work_dir, "asset_cache")
+    os.environ["CAPTION_SPRITE_CACHE_DIR"] = os.path.join(work_dir, "sprite_cache")
+
+    from benchmarks.fixtures import build_fixture
+    from benchmarks.fake_drive import FakeDrive
+
+    fixtures_dir = os.path.join(work_dir, "fixtures")
+    for duration in args.durations:
+        print(f"Building {duration}s fixture...")
+        build_fixture(os.path.join(fixtures_dir, f"short_{duration}s"), duration, args.engine, seed=BENCH_SEED)
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with FakeDrive(fixtures_dir) as drive:
+        # Inherited by the spawned render processes
+        os.environ["DRIVE_API_BASE"] = drive.api_base
+        for duration in args.durations:
+            print(f"Rendering {duration}s short ({args.backend}, {args.caption_mode})...")
+            results.append(benchmark_duration(duration, args, context))
+
+    print(f"\n{'short':>6}{'wall s':>9}{'encode s':>10}{'enc fps':>9}{'peak MB':>9}{'child MB':>10}{'size MB':>9}")
+    for result in results:
+        encode = result["stages"].get("encode")
+        print(f"{result['duration']:>5}s{result['wall_seconds']:>9.2f}"
+              f"{encode if encode is not None else float('nan'):>10.2f}"
+              f"{result['encode_fps'] or float('nan'):>9.1f}"
+              f"{result['peak_rss_bytes'] / 2**20:>9.0f}"
+              f"{result['peak_child_rss_bytes'] / 2**20:>10.0f}"
+              f"{result['output_bytes'] / 2**20:>9.2f}")
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+    if args.json:
+        commit, dirty = git_commit()
+        with open(args.json, "w") as f:
+            json.dump({
+                "commit": commit,
+                "dirty": dirty,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "host": {"platform": platform.platform(), "python": platform.python_version(),
+                         "cpus": os.cpu_count()},
+                "settings": {"backend": args.backend, "caption_mode": args.caption_mode,
+                             "engine": args.engine, "seed": BENCH_SEED},
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
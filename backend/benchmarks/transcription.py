@@ -0,0 +1,148 @@
+"""
+Transcription Engine Benchmark
+==============================
+
+Measures speed and accuracy of the transcription engines on a fixed local
+corpus so we can pick the fastest engine that stays within our caption
+accuracy budget.
+
+Corpus layout: one audio file per clip with a reference transcript next to it
+    corpus/clip_01.mp3
+    corpus/clip_01.txt
+
+Reported per engine:
+- load: seconds to load the model
+- RTF: real-time factor, transcription seconds / audio seconds (lower is faster)
+- WER: word error rate against the references, over the whole corpus
+
+Usage (from the backend directory):
+    python -m benchmarks.transcription --corpus corpus \\
+        --engines whisper:base whisper-int8:base whisper-int8:small \\
+        --max-wer 0.15 --json transcription_results.json
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import argparse
+
+from transcription_engines import create_engine
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac")
+
+
+def normalize_words(text):
+    """Lowercase and strip punctuation so WER only counts word differences"""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_edit_distance(reference, hypothesis):
+    """Levenshtein distance between two word lists"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + (ref_word != hyp_word)  # substitution
+            ))
+        previous = current
+    return previous[-1]
+
+
+def load_corpus(corpus_dir):
+    """Return (audio_path, reference_text) pairs for every clip with a transcript"""
+    clips = []
+    for audio_path in sorted(glob.glob(os.path.join(corpus_dir, "*"))):
+        base, ext = os.path.splitext(audio_path)
+        if ext.lower() not in AUDIO_EXTENSIONS or not os.path.exists(base + ".txt"):
+            continue
+        with open(base + ".txt", "r", encoding="utf-8") as f:
+            clips.append((audio_path, f.read()))
+    return clips
+
+
+def audio_duration(audio_path):
+    import whisper
+    return len(whisper.audio.load_audio(audio_path)) / whisper.audio.SAMPLE_RATE
+
+
+def benchmark_engine(spec, clips, durations):
+    engine = create_engine(spec)
+    start = time.perf_counter()
+    engine.load()
+    load_seconds = time.perf_counter() - start
+
+    errors = reference_words = 0
+    transcribe_seconds = 0.0
+    for audio_path, reference in clips:
+        start = time.perf_counter()
+        segments = engine.transcribe(audio_path)
+        transcribe_seconds += time.perf_counter() - start
+
+        ref_words = normalize_words(reference)
+        hyp_words = normalize_words(" ".join(segment["text"] for segment in segments))
+        errors += word_edit_distance(ref_words, hyp_words)
+        reference_words += len(ref_words)
+
+    audio_seconds = sum(durations.values())
+    return {
+        "engine": spec,
+        "load_seconds": round(load_seconds, 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "transcribe_seconds": round(transcribe_seconds, 3),
+        "rtf": round(transcribe_seconds / audio_seconds, 4) if audio_seconds else None,
+        "wer": round(errors / reference_words, 4) if reference_words else None,
+    }
+
+
+def format_cell(value, width, precision):
+    """Right-aligned table cell; "n/a" for a metric that could not be computed"""
+    return f"{'n/a':>{width}}" if value is None else f"{value:>{width}.{precision}f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcription engines on a local corpus")
+    parser.add_argument("--corpus", required=True, help="Directory of audio files with .txt references")
+    parser.add_argument("--engines", nargs="+", default=["whisper:base", "whisper-int8:base"])
+    parser.add_argument("--max-wer", type=float, default=None, help="Accuracy budget for the recommendation")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    clips = load_corpus(args.corpus)
+    if not clips:
+        raise SystemExit(f"No audio files with .txt references found in {args.corpus}")
+    durations = {audio_path: audio_duration(audio_path) for audio_path, _ in clips}
+    print(f"Corpus: {len(clips)} clips, {sum(durations.values()):.1f}s of audio")
+
+    results = []
+    for spec in args.engines:
+        print(f"Benchmarking {spec}...")
+        results.append(benchmark_engine(spec, clips, durations))
+
+    print(f"\n{'engine':<22}{'load s':>9}{'RTF':>9}{'WER':>9}")
+    for result in results:
+        print(f"{result['engine']:<22}{format_cell(result['load_seconds'], 9, 2)}"
+              f"{format_cell(result['rtf'], 9, 3)}{format_cell(result['wer'], 9, 3)}")
+
+    if args.max_wer is not None:
+        within_budget = [
+            r for r in results if r["wer"] is not None and r["rtf"] is not None and r["wer"] <= args.max_wer
+        ]
+        if within_budget:
+            best = min(within_budget, key=lambda r: r["rtf"])
+            print(f"\nFastest engine within WER {args.max_wer}: {best['engine']}")
+        else:
+            print(f"\nNo engine stays within WER {args.max_wer}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"corpus": os.path.abspath(args.corpus), "results": results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Caption Sprite Rasterizer for Video Generator
+=============================================
+
+Draws caption words in-process with Pillow/FreeType instead of launching
+ImageMagick through MoviePy's TextClip for every word.
+
+Sprites are keyed by (word, font, size, color, stroke color, stroke width) and
+kept in two tiers:
+1. A bounded in-memory LRU, shared by everything in the process
+2. A PNG directory on disk, shared by every task on the host, trimmed
+   least-recently-used to CAPTION_SPRITE_CACHE_MAX_BYTES
+
+The same words come back constantly in our scripts, so most words are either
+an LRU hit or a single PNG decode.
+
+Usage:
+    from caption_sprites import get_sprite_cache
+
+    sprite = get_sprite_cache().get_array("Hello", "Roboto-Bold.ttf", 45, "#FFD700")
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from lru_eviction import evict_lru
+
+DEFAULT_CACHE_DIR = os.environ.get("CAPTION_SPRITE_CACHE_DIR", "sprite_cache")
+# Bump when rasterize_word changes how sprites look, so old PNGs are not reused
+SPRITE_VERSION = 2
+DEFAULT_MAX_ENTRIES = int(os.environ.get("CAPTION_SPRITE_CACHE_ENTRIES", "2048"))
+DEFAULT_MAX_BYTES = int(os.environ.get("CAPTION_SPRITE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Walking the disk tier after every new sprite would cost more than drawing it
+EVICT_EVERY_WRITES = 64
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path, size):
+    """Load a FreeType font once per process"""
+    try:
+        return ImageFont.truetype(font_path, size)
+    except OSError:
+        print(f"Could not load font {font_path}. Using default font.")
+        return ImageFont.load_default()
+
+
+def rasterize_word(word, font_path, size, color, stroke_color=None, stroke_width=0):
+    """Draw a word as an RGBA image cropped horizontally, keeping the full line height.
+
+    Every word's image starts at the font's ascender line and is ascent +
+    descent tall, so words placed at the same y share one baseline.
+    """
+    font = load_font(font_path, size)
+    left, top, right, bottom = font.getbbox(word, stroke_width=stroke_width)
+    if hasattr(font, "getmetrics"):
+        ascent, descent = font.getmetrics()
+        origin_y, height = stroke_width, ascent + descent + 2 * stroke_width
+    else:
+        # Bitmap fallback font: no metrics, so use the word's own box
+        origin_y, height = -top, bottom - top
+    image = Image.new("RGBA", (max(1, right - left), max(1, height)), (0, 0, 0, 0))
+    ImageDraw.Draw(image).text(
+        (-left, origin_y),
+        word,
+        font=font,
+        fill=color,
+        stroke_width=stroke_width,
+        stroke_fill=stroke_color
+    )
+    return image
+
+
+class CaptionSpriteCache:
+    """In-memory LRU of word sprites backed by a shared PNG directory"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(word, font_path, size, color, stroke_color=None, stroke_width=0):
+        return (word, font_path, size, color, stroke_color, stroke_width)
+
+    def disk_path(self, key):
+        """PNG path for a sprite; the font file's size and mtime invalidate old entries"""
+        font_path = key[1]
+        try:
+            stat = os.stat(font_path)
+            font_version = f"{stat.st_size}:{int(stat.st_mtime)}"
+        except OSError:
+            font_version = "missing"
+        digest = hashlib.sha1(repr((key, font_version, SPRITE_VERSION)).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.png")
+
+    def _remember(self, key, sprite):
+        with self._lock:
+            self._sprites[key] = sprite
+            self._sprites.move_to_end(key)
+            while len(self._sprites) > self.max_entries:
+                self._sprites.popitem(last=False)
+
+    def _write_png(self, path, image):
+        """Write atomically so concurrent tasks never read a partial PNG"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format="PNG")
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._writes_since_evict += 1
+            due = self._writes_since_evict >= EVICT_EVERY_WRITES
+            if due:
+                self._writes_since_evict = 0
+        if due:
+            self.evict()
+
+    @staticmethod
+    def _touch(path):
+        """Mark a PNG as recently used for eviction"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove least recently used PNGs until the disk tier is under max_bytes"""
+        # .tmp files are being written by another task
+        evict_lru(self.cache_dir, self.max_bytes, skip=lambda name: name.endswith(".tmp"))
+
+    def _load_or_render(self, key):
+        path = self.disk_path(key) if self.cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with Image.open(path) as image:
+                    sprite = np.array(image.convert("RGBA"))
+                self._touch(path)
+                with self._lock:
+                    self.disk_hits += 1
+                return sprite
+            except OSError:
+                pass  # Half-written or corrupt file, render it again
+
+        with self._lock:
+            self.misses += 1
+        image = rasterize_word(*key)
+        if path:
+            self._write_png(path, image)
+        return np.array(image)
+
+    def get_array(self, word, font_path, size, color, stroke_color=None, stroke_width=0):
+        """Return the sprite as a read-only HxWx4 uint8 array"""
+        key = self.make_key(word, font_path, size, color, stroke_color, stroke_width)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+
+        sprite = self._load_or_render(key)
+        sprite.flags.writeable = False
+        self._remember(key, sprite)
+        return sprite
+
+    def get_image(self, word, font_path, size, color, stroke_color=None, stroke_width=0):
+        """Return the sprite as a PIL RGBA image"""
+        return Image.fromarray(self.get_array(word, font_path, size, color, stroke_color, stroke_width))
+
+    def get_path(self, word, font_path, size, color, stroke_color=None, stroke_width=0):
+        """Return a PNG file holding the sprite, for consumers that read from disk"""
+        key = self.make_key(word, font_path, size, color, stroke_color, stroke_width)
+        if not self.cache_dir:
+            raise ValueError("Sprite cache has no disk tier")
+        path = self.disk_path(key)
+        if os.path.exists(path):
+            self._touch(path)
+        else:
+            # Either a miss (written by get_array) or an LRU hit whose file was evicted
+            sprite = self.get_array(*key)
+            if not os.path.exists(path):
+                self._write_png(path, Image.fromarray(sprite))
+        return path
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._sprites),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+_default_cache = None
+
+
+def get_sprite_cache():
+    """Process-wide sprite cache, created on first use"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CaptionSpriteCache()
+    return _default_cache
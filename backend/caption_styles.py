@@ -9,40 +9,87 @@ Styles Available:
 1. Typewriter Reveal - Letters appear one by one with cursor
 2. Glitch Pop-In - Text flickers with RGB shifts  
 
+Captions are produced as sprite records that caption_blitter blends straight
+into each frame, as word sprite PNGs for the ffmpeg overlay path, or as an
+Advanced SubStation Alpha script that ffmpeg/libass burns in during encode.
+
 Usage:
     from caption_styles import CaptionStyleManager
     
     manager = CaptionStyleManager(target_resolution, custom_font)
     style_index = manager.select_random_style()
-    clips = manager.create_caption_clips(segments, video_width, style_index)
+    
+    # Sprites blended in place by caption_blitter.CaptionBlitClip
+    sprites = manager.create_caption_sprites(manager.plan_caption_words(segments, style_index))
+    
+    # or, for the libass path
+    manager.create_ass_subtitles(segments, "captions.ass", style_index)
 """
 
 import random
 import math
-from moviepy.video.VideoClip import TextClip
+from collections import namedtuple
+from caption_sprites import get_sprite_cache, load_font
+from caption_blitter import CaptionSprite, SpriteImage
+
+
+# One timed word of the caption track, independent of how it gets rendered
+CaptionWord = namedtuple("CaptionWord", ["word", "start", "duration", "style_index"])
+
+# Family named in ASS styles when the caption font could not be loaded
+ASS_FALLBACK_FONT = "Arial"
+
+STYLE_NAMES = [
+    "Typewriter Reveal",
+    "Glitch Pop-In"
+]
 
 
 class CaptionStyleManager:
     """Manages different caption transition styles"""
     
-    def __init__(self, target_resolution, custom_font):
+    def __init__(self, target_resolution, custom_font, sprite_cache=None):
         self.target_resolution = target_resolution
         self.custom_font = custom_font
+        self.sprite_cache = sprite_cache or get_sprite_cache()
         self.elevation = 120
+        self.fontsize = 45
         
-        self.style_names = [
-            "Typewriter Reveal",
-            "Glitch Pop-In"
-        ]
+        self.style_names = list(STYLE_NAMES)
         
         self.style_colors = [
             "#FFD700",  # Gold for typewriter
             "#FF0080"   # Glitch pink
         ]
+        
+        # (fade in, fade out) seconds applied to each word clip
+        self.style_fades = [
+            (0.1, 0.05),
+            (0.02, 0.02)
+        ]
+        
+        # (dx, dy, share of the word's duration) a word starts offset by and eases back from;
+        # the glitch snaps into place like its ASS \move
+        self.style_shakes = [
+            (0, 0, 0.0),
+            (6, -3, 0.15)
+        ]
+        
+        # ASS style name used for each caption style
+        self.ass_style_names = [
+            "Typewriter",
+            "Glitch"
+        ]
+    
+    @property
+    def caption_y(self):
+        """Top edge of the caption line in frame coordinates"""
+        return self.target_resolution[1] - 100 - self.elevation
     
-    def select_random_style(self):
-        """Select a random caption style and return its index"""
-        style_index = random.randint(0, len(self.style_names) - 1)
+    def select_random_style(self, rng=None):
+        """Select a random caption style and return its index; pass a seeded
+        random.Random as rng for a reproducible choice"""
+        style_index = (rng or random).randint(0, len(self.style_names) - 1)
         print(f"Selected caption style: {self.style_names[style_index]}")
         return style_index
     
@@ -50,73 +97,13 @@ class CaptionStyleManager:
         """Get the name of a style by its index"""
         return self.style_names[style_index]
     
-    def create_typewriter_word_clip(self, word, start_time, duration, video_width):
-        """Typewriter effect - letters appear one by one with cursor"""
-        
-        def typewriter_effect(get_frame, t):
-            frame = get_frame(t)
-            if t < duration * 0.1:  # During first 10% of duration
-                chars_to_show = int((t / (duration * 0.1)) * len(word))
-                partial_word = word[:chars_to_show] + "|"  # Add cursor
-                return frame
-            return frame
-        
-        text_clip = TextClip(
-            txt=word,
-            fontsize=45,
-            font=self.custom_font,
-            color=self.style_colors[0],  # Gold
-            method="caption"
-        ).set_duration(duration).set_start(start_time)
-        
-        text_clip = text_clip.set_position(("center", self.target_resolution[1] - 100 - self.elevation))
-        return text_clip.fadein(0.1).fadeout(0.05)
-    
-    def create_glitch_word_clip(self, word, start_time, duration, video_width):
-        """Glitch effect - text flickers with RGB shifts"""
-        
-        def glitch_effect(get_frame, t):
-            frame = get_frame(t)
-            if t < duration * 0.15:  # Glitch during first 15%
-                # Simple glitch simulation by returning frame
-                return frame
-            return frame
-        
-        text_clip = TextClip(
-            txt=word,
-            fontsize=45,
-            font=self.custom_font,
-            color=self.style_colors[1],  # Glitch pink
-            method="caption"
-        ).set_duration(duration).set_start(start_time)
-        
-        text_clip = text_clip.set_position(("center", self.target_resolution[1] - 100 - self.elevation))
-        
-        # Quick glitch-like transition
-        return text_clip.fadein(0.02).fadeout(0.02)
-    
-    def create_word_clip_with_style(self, word, start_time, duration, video_width, style_index):
-        """Create word clip with specified style"""
-        
-        styles = [
-            self.create_typewriter_word_clip,
-            self.create_glitch_word_clip
-        ]
-        
-        if 0 <= style_index < len(styles):
-            selected_style = styles[style_index]
-            return selected_style(word, start_time, duration, video_width)
-        else:
-            # Fallback to typewriter if invalid index
-            return self.create_typewriter_word_clip(word, start_time, duration, video_width)
-    
-    def create_caption_clips(self, segments, video_width, style_index=None):
-        """Create caption clips with specified or random style"""
+    def plan_caption_words(self, segments, style_index=None):
+        """Split Whisper segments into timed words sharing one style"""
         
         if style_index is None:
             style_index = self.select_random_style()
         
-        clips = []
+        words_out = []
         
         for segment in segments:
             words = segment["text"].strip().split()
@@ -135,28 +122,175 @@ class CaptionStyleManager:
                 if not word:
                     continue
                 
-                # Create word clip with selected style
-                word_clip = self.create_word_clip_with_style(
-                    word, 
-                    current_start, 
-                    word_duration,  # Exact duration, no extension
-                    video_width,
-                    style_index
-                )
-                
-                clips.append(word_clip)
+                words_out.append(CaptionWord(word, current_start, word_duration, style_index))
                 
                 # Move to next word with precise timing - no overlap
                 current_start += word_duration
         
-        return clips
+        return words_out
+    
+    def create_caption_sprites(self, caption_words):
+        """Create one CaptionSprite per planned caption word, for CaptionBlitClip"""
+        
+        images = {}  # Repeated words share one premultiplied image
+        sprites = []
+        
+        for caption in caption_words:
+            style_index = caption.style_index if 0 <= caption.style_index < len(self.style_fades) else 0
+            key = (caption.word, style_index)
+            image = images.get(key)
+            if image is None:
+                image = images[key] = SpriteImage(self.word_sprite(caption.word, style_index))
+            
+            fade_in, fade_out = self.style_fades[style_index]
+            shake_x, shake_y, shake_share = self.style_shakes[style_index]
+            sprites.append(CaptionSprite(
+                image,
+                (self.target_resolution[0] - image.width) // 2,  # Centered
+                self.caption_y,
+                caption.start,
+                caption.duration,
+                fade_in=fade_in,
+                fade_out=fade_out,
+                shake=(shake_x, shake_y),
+                shake_duration=caption.duration * shake_share
+            ))
+        
+        return sprites
+    
+    def word_sprite(self, word, style_index):
+        """RGBA array of a caption word, served from the shared sprite cache"""
+        return self.sprite_cache.get_array(
+            word, self.custom_font, self.fontsize, self.style_colors[style_index]
+        )
+    
+    def word_sprite_path(self, word, style_index):
+        """PNG file of a caption word, for renderers that read sprites from disk"""
+        return self.sprite_cache.get_path(
+            word, self.custom_font, self.fontsize, self.style_colors[style_index]
+        )
+    
+    @staticmethod
+    def _ass_time(seconds):
+        """Format seconds as an ASS timestamp (H:MM:SS.cc)"""
+        centis = max(0, int(round(seconds * 100)))
+        hours, centis = divmod(centis, 360000)
+        minutes, centis = divmod(centis, 6000)
+        secs, centis = divmod(centis, 100)
+        return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+    
+    @staticmethod
+    def _ass_color(hex_color, alpha=0):
+        """Convert #RRGGBB to the &HAABBGGRR form used by ASS"""
+        red, green, blue = hex_color[1:3], hex_color[3:5], hex_color[5:7]
+        return f"&H{alpha:02X}{blue}{green}{red}".upper()
+    
+    @staticmethod
+    def _ass_escape(word):
+        """Keep words from being read as override blocks or escapes"""
+        return word.replace("\\", "/").replace("{", "(").replace("}", ")")
+    
+    def _ass_typewriter_text(self, caption):
+        """Letters appear one by one during the first 10% via karaoke timing"""
+        x, y = self.target_resolution[0] // 2, self.caption_y
+        fade_in, fade_out = self.style_fades[0]
+        reveal_cs = max(1, int(round(caption.duration * 0.1 * 100 / max(1, len(caption.word)))))
+        # A word that began before the script did (a later segment's slice) picks
+        # up mid-way: no second fade-in, and letters already revealed show at once
+        elapsed_cs = int(round(max(0.0, -caption.start) * 100))
+        if elapsed_cs:
+            fade_in = 0
+        bounds = [max(0, i * reveal_cs - elapsed_cs) for i in range(len(caption.word) + 1)]
+        letters = "".join(
+            f"{{\\k{bounds[i + 1] - bounds[i]}}}{self._ass_escape(char)}" for i, char in enumerate(caption.word)
+        )
+        return f"{{\\pos({x},{y})\\fad({int(fade_in * 1000)},{int(fade_out * 1000)})}}{letters}"
+    
+    def _ass_glitch_text(self, caption, offset=0):
+        """Text snaps into place from a shifted position during the first 15%"""
+        x, y = self.target_resolution[0] // 2, self.caption_y
+        fade_in, fade_out = self.style_fades[1]
+        glitch_ms = int(caption.duration * 0.15 * 1000)
+        # As in _ass_typewriter_text, resume a word that began before the script
+        elapsed_ms = int(max(0.0, -caption.start) * 1000)
+        if elapsed_ms:
+            fade_in = 0
+        if elapsed_ms >= glitch_ms:
+            position = f"\\pos({x + offset},{y})"
+        else:
+            remaining = 1.0 - elapsed_ms / glitch_ms
+            position = (
+                f"\\move({x + offset + round(6 * remaining)},{y - round(3 * remaining)},"
+                f"{x + offset},{y},0,{glitch_ms - elapsed_ms})"
+            )
+        return (
+            f"{{{position}\\fad({int(fade_in * 1000)},{int(fade_out * 1000)})}}"
+            f"{self._ass_escape(caption.word)}"
+        )
+    
+    def build_ass_script(self, caption_words):
+        """Render timed caption words as an Advanced SubStation Alpha script"""
+        width, height = self.target_resolution
+        font = load_font(self.custom_font, self.fontsize)
+        # The bitmap fallback font has no family name; libass then substitutes
+        font_name = font.getname()[0] if hasattr(font, "getname") else ASS_FALLBACK_FONT
+        
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {width}",
+            f"PlayResY: {height}",
+            "WrapStyle: 2",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+            "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+            "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        ]
+        for style_name, color in zip(self.ass_style_names, self.style_colors):
+            # Secondary colour is fully transparent so \k hides letters until their turn
+            lines.append(
+                f"Style: {style_name},{font_name},{self.fontsize},{self._ass_color(color)},"
+                f"&HFF000000,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,0,0,8,0,0,0,1"
+            )
+        # Cyan ghost layer for the glitch RGB shift
+        lines.append(
+            f"Style: GlitchGhost,{font_name},{self.fontsize},{self._ass_color('#00FFFF', 0x80)},"
+            f"&HFF000000,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,0,0,8,0,0,0,1"
+        )
+        lines += [
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+        
+        for caption in caption_words:
+            start = self._ass_time(caption.start)
+            end = self._ass_time(caption.start + caption.duration)
+            if caption.style_index == 1:
+                ghost_end = self._ass_time(caption.start + caption.duration * 0.15)
+                if ghost_end != start:  # Unless the glitch was over before the script began
+                    lines.append(f"Dialogue: 0,{start},{ghost_end},GlitchGhost,,0,0,0,,{self._ass_glitch_text(caption, -6)}")
+                lines.append(f"Dialogue: 1,{start},{end},Glitch,,0,0,0,,{self._ass_glitch_text(caption)}")
+            else:
+                lines.append(f"Dialogue: 1,{start},{end},Typewriter,,0,0,0,,{self._ass_typewriter_text(caption)}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def create_ass_subtitles(self, segments, ass_path, style_index=None):
+        """Write the caption track for segments as an ASS file and return its path"""
+        caption_words = self.plan_caption_words(segments, style_index)
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write(self.build_ass_script(caption_words))
+        return ass_path
     
     def add_custom_style(self, style_name, style_function, style_color):
         """Add a custom caption style"""
         self.style_names.append(style_name)
         self.style_colors.append(style_color)
-        # Note: You would need to modify the create_word_clip_with_style method
-        # to include the new style function
+        # Note: You would need to extend style_fades, style_shakes and
+        # build_ass_script to include the new style
         print(f"Added custom style: {style_name}")
     
     def list_available_styles(self):
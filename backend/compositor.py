@@ -0,0 +1,53 @@
+"""
+Caption Timeline Index for Video Generator
+==========================================
+
+CompositeVideoClip asks every layer whether it is playing on every frame, which
+is O(frames x words) once a script has a few hundred captions. ClipTimeline
+keeps the caption timeline in sorted, array-backed start/end columns and uses
+bisect to find the handful of items active at t, so each frame only touches the
+captions it actually shows. Anything with start and end attributes can be
+indexed; caption_blitter uses it for its CaptionSprites.
+
+Usage:
+    from compositor import ClipTimeline
+
+    timeline = ClipTimeline(sprites)
+    active = timeline.active(t)
+"""
+
+from array import array
+from bisect import bisect_right
+
+
+class ClipTimeline:
+    """Struct-of-arrays index of overlay clips sorted by start time"""
+
+    __slots__ = ("starts", "ends", "order", "clips", "max_duration")
+
+    def __init__(self, clips):
+        indexed = sorted(enumerate(clips), key=lambda item: item[1].start)
+        self.starts = array("d", (clip.start for _, clip in indexed))
+        self.ends = array("d", (
+            clip.end if clip.end is not None else float("inf") for _, clip in indexed
+        ))
+        self.order = array("l", (position for position, _ in indexed))
+        self.clips = [clip for _, clip in indexed]
+        self.max_duration = max(
+            (end - start for start, end in zip(self.starts, self.ends)), default=0.0
+        )
+
+    def __len__(self):
+        return len(self.clips)
+
+    def active(self, t):
+        """Clips playing at t, in their original layer order"""
+        hi = bisect_right(self.starts, t)
+        if hi == 0:
+            return []
+        # A clip can only still be playing if it started less than max_duration ago
+        lo = bisect_right(self.starts, t - self.max_duration)
+        active = [i for i in range(lo, hi) if t < self.ends[i]]
+        if len(active) > 1:
+            active.sort(key=self.order.__getitem__)
+        return [self.clips[i] for i in active]
@@ -0,0 +1,200 @@
+"""
+Drive Credentials for Video Generator
+=====================================
+
+Builds Drive credentials and the pooled HTTP session once per worker process
+and keeps the token fresh from a background thread, so task startup does no
+auth round trips. Drive is called through plain REST requests on that session
+(see drive_download), so no API client or discovery document is needed.
+
+AUTHENTICATION SETUP (Choose one method):
+
+METHOD 1 - SERVICE ACCOUNT (Recommended):
+    Place the key as 'service-account-key.json' next to this script and share
+    the Drive folder with the service account email.
+
+METHOD 2 - OAUTH:
+    Save the Desktop OAuth client as 'credentials.json' and run once:
+        python drive_auth.py
+    This opens the consent screen and writes 'token.json'. Render processes
+    never open a browser; they only read and refresh the shared token.json,
+    under a file lock so concurrent workers do not clobber each other's refresh.
+
+Usage:
+    from drive_auth import get_credentials, get_drive_session
+
+    session = get_drive_session()
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
+SERVICE_ACCOUNT_FILE = os.environ.get("DRIVE_SERVICE_ACCOUNT_FILE", "service-account-key.json")
+CLIENT_SECRETS_FILE = os.environ.get("DRIVE_CLIENT_SECRETS_FILE", "credentials.json")
+TOKEN_FILE = os.environ.get("DRIVE_TOKEN_FILE", "token.json")
+REFRESH_MARGIN = 300  # Refresh this many seconds before the token expires
+RETRY_DELAY = 30
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive inter-process lock on path + '.lock'"""
+    with open(f"{path}.lock", "a+") as lock_file:
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            try:
+                import fcntl
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            except ImportError:
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class DriveCredentialManager:
+    """Process-wide Drive credentials and session with background refresh"""
+
+    def __init__(self, service_account_file=SERVICE_ACCOUNT_FILE, token_file=TOKEN_FILE):
+        self.service_account_file = service_account_file
+        self.token_file = token_file
+        self._credentials = None
+        self._session = None
+        self._lock = threading.RLock()
+        self._refresher = None
+
+    def _load(self):
+        if os.path.exists(self.service_account_file):
+            from google.oauth2 import service_account
+            return service_account.Credentials.from_service_account_file(
+                self.service_account_file, scopes=SCOPES
+            )
+
+        print(f"Service account file '{self.service_account_file}' not found. Using OAuth token.")
+        if not os.path.exists(self.token_file):
+            raise RuntimeError(
+                f"No Drive credentials: add '{self.service_account_file}' or run "
+                f"'python drive_auth.py' once to create '{self.token_file}'"
+            )
+        from google.oauth2.credentials import Credentials
+        return Credentials.from_authorized_user_file(self.token_file, SCOPES)
+
+    def _is_oauth(self, creds):
+        return hasattr(creds, "refresh_token")
+
+    def _refresh(self, creds):
+        """Refresh creds in place; OAuth tokens go through the shared token file"""
+        from google.auth.transport.requests import Request
+
+        if not self._is_oauth(creds):
+            creds.refresh(Request())
+            return
+
+        with _file_lock(self.token_file):
+            # Another worker may already have refreshed the shared token
+            from google.oauth2.credentials import Credentials
+            try:
+                shared = Credentials.from_authorized_user_file(self.token_file, SCOPES)
+            except (OSError, ValueError):
+                shared = None
+            if shared is not None and shared.valid and self._seconds_left(shared) > REFRESH_MARGIN:
+                creds.token = shared.token
+                creds.expiry = shared.expiry
+                return
+
+            creds.refresh(Request())
+            tmp_path = f"{self.token_file}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as token:
+                token.write(creds.to_json())
+            os.replace(tmp_path, self.token_file)
+
+    @staticmethod
+    def _seconds_left(creds):
+        if creds.expiry is None:
+            return float("inf")
+        return (creds.expiry - datetime.utcnow()).total_seconds()
+
+    def _refresh_loop(self):
+        while True:
+            with self._lock:
+                creds = self._credentials
+            delay = min(3600, max(0, self._seconds_left(creds) - REFRESH_MARGIN))
+            time.sleep(delay)
+            try:
+                with self._lock:
+                    self._refresh(creds)
+            except Exception as e:
+                print(f"Background Drive token refresh failed: {e}")
+                time.sleep(RETRY_DELAY)
+
+    def credentials(self):
+        """Valid credentials, loaded once per process"""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._load()
+            if not self._credentials.valid or self._seconds_left(self._credentials) < REFRESH_MARGIN:
+                self._refresh(self._credentials)
+            if self._refresher is None:
+                self._refresher = threading.Thread(
+                    target=self._refresh_loop, daemon=True, name="drive-token-refresh"
+                )
+                self._refresher.start()
+            return self._credentials
+
+    def session(self):
+        """Pooled AuthorizedSession reused by every download in this process"""
+        with self._lock:
+            if self._session is None:
+                from drive_download import create_session
+                self._session = create_session(self.credentials())
+            else:
+                self.credentials()
+            return self._session
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DriveCredentialManager()
+        return _manager
+
+
+def get_credentials():
+    return get_manager().credentials()
+
+
+def get_drive_session():
+    return get_manager().session()
+
+
+def authorize_interactively():
+    """One-time OAuth consent that writes the shared token file"""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
+    # Request offline access for refresh tokens
+    creds = flow.run_local_server(port=0, access_type='offline', prompt='consent')
+    with _file_lock(TOKEN_FILE):
+        with open(TOKEN_FILE, "w") as token:
+            token.write(creds.to_json())
+    print(f"Credentials saved to {TOKEN_FILE}")
+
+
+if __name__ == "__main__":
+    authorize_interactively()
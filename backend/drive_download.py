@@ -0,0 +1,203 @@
+"""
+Google Drive Downloader for Video Generator
+===========================================
+
+Fetches the assets of a Drive folder (8 PNG stills and the narration MP3).
+
+- The folder listing is paged with pageSize/nextPageToken, so large folders are
+  listed completely
+- Files are downloaded concurrently on a bounded thread pool, all sharing one
+  keep-alive connection pool (an AuthorizedSession with a sized HTTPAdapter)
+- Media is streamed in large chunks into a temp file that is renamed into place
+- Throttling (429), server errors and dropped connections are retried with
+  exponential backoff
+- With an AssetCache, files already fetched on this host (same md5Checksum)
+  are linked from the cache instead of downloaded
+
+The Drive v3 REST endpoints are called directly, so api_base can point at a
+local Drive stand-in for testing and benchmarks.
+
+Usage:
+    from drive_download import DriveDownloader, create_session
+
+    downloader = DriveDownloader(create_session(credentials), asset_cache=AssetCache())
+    downloader.download_folder(folder_id, images_folder, audio_path)
+"""
+
+import os
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import timed
+
+DRIVE_API_BASE = os.environ.get("DRIVE_API_BASE", "https://www.googleapis.com/drive/v3")
+DEFAULT_WORKERS = int(os.environ.get("DRIVE_DOWNLOAD_WORKERS", "6"))
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+PAGE_SIZE = 1000
+LIST_FIELDS = "nextPageToken, files(id, name, mimeType, md5Checksum, size, modifiedTime)"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+AUDIO_MIME_TYPES = ("audio/mpeg", "application/octet-stream")
+
+
+def create_session(credentials, pool_size=DEFAULT_WORKERS):
+    """Authorized session whose connection pool fits the download workers"""
+    from google.auth.transport.requests import AuthorizedSession, Request
+
+    # Refresh once up front so worker threads don't race to refresh the token
+    if not credentials.valid:
+        credentials.refresh(Request())
+
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def output_path_for(file, image_folder, audio_filename):
+    """Where a listed Drive file should be saved, or None to skip it"""
+    name = file["name"]
+    mime = file["mimeType"]
+    base, ext = os.path.splitext(name)
+
+    if mime == "image/png":
+        if ext.lower() != ".png":
+            name = f"{base}.png"
+        return os.path.join(image_folder, name)
+    if mime in AUDIO_MIME_TYPES:
+        return audio_filename
+    return None
+
+
+class DriveDownloader:
+    """Lists and downloads Drive folders over a shared HTTP session"""
+
+    def __init__(self, session, api_base=DRIVE_API_BASE, workers=DEFAULT_WORKERS,
+                 chunk_size=DEFAULT_CHUNK_SIZE, max_retries=5, backoff=0.5, timeout=60,
+                 asset_cache=None):
+        self.session = session
+        self.asset_cache = asset_cache
+        self.api_base = api_base.rstrip("/")
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _sleep_before_retry(self, attempt, response=None):
+        delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        time.sleep(delay)
+
+    def _get(self, url, params=None, stream=False):
+        """GET with retries on throttling, server errors and connection failures"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, params=params, stream=stream, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                self._sleep_before_retry(attempt, response)
+                continue
+            response.raise_for_status()
+            return response
+
+    def list_folder(self, folder_id):
+        """Every non-trashed file in the folder, following nextPageToken"""
+        files = []
+        params = {
+            "q": f"'{folder_id}' in parents and trashed = false",
+            "fields": LIST_FIELDS,
+            "pageSize": PAGE_SIZE,
+        }
+        while True:
+            page = self._get(f"{self.api_base}/files", params=params).json()
+            files.extend(page.get("files", []))
+            token = page.get("nextPageToken")
+            if not token:
+                return files
+            params["pageToken"] = token
+
+    def download_file(self, file_id, out_path):
+        """Stream one file's media into out_path"""
+        tmp_path = f"{out_path}.part"
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._get(f"{self.api_base}/files/{file_id}", params={"alt": "media"}, stream=True) as response:
+                    with open(tmp_path, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                # The connection dropped mid-body; start this file over
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt)
+        os.replace(tmp_path, out_path)
+        return out_path
+
+    def fetch(self, file, out_path):
+        """Put a listed file at out_path, through the asset cache when there is one"""
+        if self.asset_cache is None:
+            with timed("download_file"):
+                return self.download_file(file["id"], out_path)
+
+        blob_path = self.asset_cache.lookup(file)
+        if blob_path is not None:
+            try:
+                return self.asset_cache.link_into(blob_path, out_path)
+            except FileNotFoundError:
+                pass  # Evicted by another task between lookup and link; download it again
+
+        temp_path = self.asset_cache.temp_path(file)
+        with timed("download_file"):
+            self.download_file(file["id"], temp_path)
+        blob_path = self.asset_cache.store(file, temp_path)
+        try:
+            return self.asset_cache.link_into(blob_path, out_path)
+        except FileNotFoundError:
+            # Evicted as soon as it was stored (cache smaller than this file); keep a copy anyway
+            self.download_file(file["id"], out_path)
+            return out_path
+
+    def fetch_files(self, jobs):
+        """Fetch (file, out_path) pairs concurrently"""
+        if not jobs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+            futures = [pool.submit(self.fetch, file, out_path) for file, out_path in jobs]
+            return [future.result() for future in futures]
+
+    def plan_folder(self, folder_id, image_folder, audio_filename, files=None):
+        """List the folder (unless its listing is given) and return the (file, out_path) pairs to fetch"""
+        os.makedirs(image_folder, exist_ok=True)
+
+        # Later files win when two map to the same path, as with sequential downloads
+        jobs = {}
+        for file in files if files is not None else self.list_folder(folder_id):
+            out_path = output_path_for(file, image_folder, audio_filename)
+            if out_path is not None:
+                jobs[out_path] = file
+        return [(file, out_path) for out_path, file in jobs.items()]
+
+    def download_folder(self, folder_id, image_folder, audio_filename):
+        """Download the folder's PNGs into image_folder and its audio to audio_filename"""
+        jobs = self.plan_folder(folder_id, image_folder, audio_filename)
+        self.fetch_files(jobs)
+        if self.asset_cache is not None:
+            print(f"Fetched {len(jobs)} files from Drive folder {folder_id} "
+                  f"({self.asset_cache.hits} cached, {self.asset_cache.misses} downloaded)")
+        else:
+            print(f"Downloaded {len(jobs)} files from Drive folder {folder_id}")
+        return jobs
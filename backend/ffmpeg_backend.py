@@ -0,0 +1,227 @@
+"""
+FFmpeg Render Backend for Video Generator
+=========================================
+
+Alternative to the MoviePy compositing path. The whole timeline (looped stills,
+blur fade in/out, title overlay, word captions and the audio track) is compiled
+into a single ffmpeg filter_complex invocation, so every frame is produced by
+ffmpeg's C filters instead of being pulled through Python.
+
+The blur transition is a blend between each still and a boxblurred copy of it,
+weighted the same way as transitions.BlurTransition picks its radius. Caption
+fades and the glitch style's snap-in match caption_blitter: a fade scales the
+sprite's alpha, and the shake offset decays linearly to zero through
+time-dependent overlay x/y expressions. Each distinct caption sprite is one
+input, split to the words that use it; every word is still one overlay,
+enabled only during that word. When an ASS caption script is given, captions
+are burned in by libass instead.
+
+Stills may be passed as in-memory arrays (see image_prep); they are written
+as uncompressed BMPs for ffmpeg to read, so there is no PNG encode/decode.
+
+Usage:
+    from ffmpeg_backend import render_with_ffmpeg
+
+    render_with_ffmpeg(stills, title_path, audio_path, clip_duration,
+                       caption_words, caption_manager, output_file, work_dir)
+"""
+
+import os
+import subprocess
+
+from renditions import rendition_graph, rendition_output_args, thumbnail_frame_index
+
+
+def _filter_value(value):
+    """Quote a filter option value such as a file path"""
+    return "'" + value.replace("\\", "/").replace("'", "'\\''") + "'"
+
+
+def ass_filter(ass_path, fonts_dir=None):
+    """libass filter burning in the given ASS script"""
+    spec = f"ass=filename={_filter_value(ass_path)}"
+    if fonts_dir:
+        spec += f":fontsdir={_filter_value(fonts_dir)}"
+    return spec
+
+
+def _shake_expr(base, offset, start, shake_duration):
+    """Overlay position easing from base + offset back to base, like CaptionSprite.offset"""
+    if not offset or shake_duration <= 0:
+        return base
+    return f"{base}+if(lt(t-{start},{shake_duration}),round({offset}*(1-(t-{start})/{shake_duration})),0)"
+
+
+def _blur_stream(index, clip_duration, blur_duration, max_radius, fps):
+    """Filter chain turning input `index` into one blurred-in/out still segment"""
+    weight = (
+        f"clip(max(1-T/{blur_duration},1-({clip_duration}-T)/{blur_duration}),0,1)"
+    )
+    return (
+        f"[{index}:v]fps={fps},setsar=1,format=yuv444p,split[s{index}a][s{index}b];"
+        f"[s{index}b]boxblur=luma_radius={max_radius}:luma_power=3[s{index}c];"
+        f"[s{index}a][s{index}c]blend=all_expr='A+(B-A)*{weight}',"
+        f"trim=duration={clip_duration}[v{index}]"
+    )
+
+
+def build_ffmpeg_command(still_paths, title_overlay_path, audio_path, clip_duration,
+                         caption_inputs, output_file, filter_script_path, fps=24,
+                         blur_duration=1.0, max_radius=20, caption_y=0,
+                         preset="medium", crf=23, ass_path=None, fonts_dir=None,
+                         outputs=None, source_size=None, thumbnail_time=0.0):
+    """
+    Build the ffmpeg argument list and filtergraph for a render.
+
+    caption_inputs is a list of (sprite_path, start, duration, fade_in, fade_out,
+    (shake_x, shake_y, shake_duration)).
+    If ass_path is set the ASS script is burned in after the overlays.
+    outputs, if given, is a list of (Rendition, path) from renditions; the
+    finished frames are split to all of them in this same pass instead of
+    being encoded to output_file only.
+    Returns (args, filtergraph); the filtergraph has to be written to
+    filter_script_path before running args.
+    """
+    video_duration = clip_duration * len(still_paths)
+    args = ["ffmpeg", "-y", "-loglevel", "error"]
+    graph = []
+
+    # Inputs 0..n-1: the stills, each looped for its own slot
+    for path in still_paths:
+        args += ["-loop", "1", "-framerate", str(fps), "-t", str(clip_duration), "-i", path]
+    for i in range(len(still_paths)):
+        graph.append(_blur_stream(i, clip_duration, blur_duration, max_radius, fps))
+
+    concat_inputs = "".join(f"[v{i}]" for i in range(len(still_paths)))
+    graph.append(f"{concat_inputs}concat=n={len(still_paths)}:v=1:a=0[base]")
+
+    # Title overlay covers the whole frame and never changes
+    title_index = len(still_paths)
+    args += ["-loop", "1", "-framerate", str(fps), "-t", str(video_duration), "-i", title_overlay_path]
+    graph.append(f"[base][{title_index}:v]overlay=0:0:eof_action=pass[t0]")
+
+    # One looped input per distinct sprite, split to each of its words; a
+    # branch is trimmed to its word's window and only blended while enabled
+    sprites = {}
+    for n, (sprite_path, *word) in enumerate(caption_inputs):
+        sprites.setdefault(sprite_path, []).append((n, *word))
+
+    overlays = []
+    for g, (sprite_path, words) in enumerate(sprites.items()):
+        index = title_index + 1 + g
+        # Decoded up to the sprite's last word only
+        span = max(start + duration for _, start, duration, *_ in words)
+        args += ["-loop", "1", "-framerate", str(fps), "-t", str(span), "-i", sprite_path]
+        labels = "".join(f"[w{n}]" for n, *_ in words)
+        graph.append(f"[{index}:v]format=rgba,split={len(words)}{labels}")
+        for n, start, duration, fade_in, fade_out, shake in words:
+            end = start + duration
+            fade_out_start = max(start, end - fade_out)
+            graph.append(
+                f"[w{n}]trim=start={start}:end={end},"
+                f"fade=t=in:st={start}:d={fade_in}:alpha=1,"
+                f"fade=t=out:st={fade_out_start}:d={fade_out}:alpha=1[c{n}]"
+            )
+            overlays.append((n, start, end, shake))
+
+    last = "t0"
+    for n, start, end, (shake_x, shake_y, shake_duration) in sorted(overlays):
+        x = _shake_expr("(W-w)/2", shake_x, start, shake_duration)
+        y = _shake_expr(str(caption_y), shake_y, start, shake_duration)
+        graph.append(
+            f"[{last}][c{n}]overlay=x='{x}':y='{y}':eof_action=pass:"
+            f"enable='between(t,{start},{end})'[t{n + 1}]"
+        )
+        last = f"t{n + 1}"
+
+    if ass_path:
+        graph.append(f"[{last}]{ass_filter(ass_path, fonts_dir)}[ass]")
+        last = "ass"
+
+    audio_index = title_index + 1 + len(sprites)
+    args += ["-i", audio_path]
+
+    if outputs:
+        # The short keeps this render's own encoder settings
+        short, path = outputs[0]
+        short = short._replace(codec_args=["-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-c:a", "aac"])
+        outputs = [(short, path)] + list(outputs[1:])
+        thumbnail_frame = thumbnail_frame_index(thumbnail_time, fps, video_duration)
+        graph += rendition_graph(last, outputs, source_size, thumbnail_frame=thumbnail_frame)
+        args += ["-filter_complex_script", filter_script_path]
+        args += rendition_output_args(outputs, f"{audio_index}:a", fps, video_duration)
+        return args, ";\n".join(graph)
+
+    graph.append(f"[{last}]format=yuv420p[vout]")
+    args += [
+        "-filter_complex_script", filter_script_path,
+        "-map", "[vout]", "-map", f"{audio_index}:a",
+        "-r", str(fps),
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+        "-c:a", "aac",
+        "-t", str(video_duration),
+        "-movflags", "+faststart",  # moov atom first so playback can start early
+        output_file,
+    ]
+    return args, ";\n".join(graph)
+
+
+def caption_overlay_inputs(caption_words, caption_manager):
+    """Map caption words to overlay inputs backed by the on-disk sprite cache"""
+    caption_inputs = []
+    for caption in caption_words:
+        path = caption_manager.word_sprite_path(caption.word, caption.style_index)
+        fade_in, fade_out = caption_manager.style_fades[caption.style_index]
+        shake_x, shake_y, shake_share = caption_manager.style_shakes[caption.style_index]
+        caption_inputs.append((
+            path, caption.start, caption.duration, fade_in, fade_out,
+            (shake_x, shake_y, caption.duration * shake_share)
+        ))
+    return caption_inputs
+
+
+def write_stills(stills, work_dir):
+    """Paths ffmpeg can read for each still; arrays are written as uncompressed BMPs"""
+    from PIL import Image
+
+    still_paths = []
+    for i, still in enumerate(stills):
+        if isinstance(still, str):
+            still_paths.append(still)
+            continue
+        path = os.path.join(work_dir, f"still_{i}.bmp")
+        Image.fromarray(still).save(path)
+        still_paths.append(path)
+    return still_paths
+
+
+def render_with_ffmpeg(stills, title_overlay_path, audio_path, clip_duration,
+                       caption_words, caption_manager, output_file, work_dir, fps=24,
+                       preset="medium", crf=23, caption_mode="clips", outputs=None,
+                       thumbnail_time=0.0):
+    """Render the short (and any renditions in outputs) with one ffmpeg process and return output_file"""
+    os.makedirs(work_dir, exist_ok=True)
+    still_paths = write_stills(stills, work_dir)
+    filter_script_path = os.path.join(work_dir, "filtergraph.txt")
+    ass_path = fonts_dir = None
+    if caption_mode == "ass":
+        ass_path = os.path.join(work_dir, "captions.ass")
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write(caption_manager.build_ass_script(caption_words))
+        fonts_dir = os.path.dirname(os.path.abspath(caption_manager.custom_font))
+        caption_inputs = []
+    else:
+        caption_inputs = caption_overlay_inputs(caption_words, caption_manager)
+
+    args, graph = build_ffmpeg_command(
+        still_paths, title_overlay_path, audio_path, clip_duration, caption_inputs,
+        output_file, filter_script_path, fps=fps, caption_y=caption_manager.caption_y,
+        preset=preset, crf=crf, ass_path=ass_path, fonts_dir=fonts_dir,
+        outputs=outputs, source_size=caption_manager.target_resolution, thumbnail_time=thumbnail_time
+    )
+    with open(filter_script_path, "w") as f:
+        f.write(graph)
+
+    print(f"Rendering with ffmpeg filtergraph ({len(caption_inputs)} caption overlays)...")
+    subprocess.run(args, check=True)
+    return output_file
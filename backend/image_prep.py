@@ -0,0 +1,152 @@
+"""
+Still Image Preparation for Video Generator
+===========================================
+
+Turns the downloaded PNGs into the 576x1024 stills used by the compositor: a
+blurred, stretched copy of the image as background with the image fitted on top.
+
+The stills stay in memory. They are prepared in parallel on a process pool
+that lives as long as the worker process, and each worker writes its result
+straight into one shared-memory block, so nothing is PNG-encoded, written to
+disk or pickled back to the caller.
+
+Usage:
+    from image_prep import prepare_stills
+
+    stills = prepare_stills(image_paths, (576, 1024))
+    try:
+        clips = [ImageClip(still) for still in stills]
+        ...
+    finally:
+        stills.close()
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+DEFAULT_WORKERS = int(os.environ.get("IMAGE_PREP_WORKERS", min(8, os.cpu_count() or 1)))
+
+
+def prepare_base_image(image_path, target_size):
+    """Return the styled still for image_path as an HxWx3 uint8 array"""
+    img = Image.open(image_path).convert("RGB")
+    bg = img.resize(target_size).filter(ImageFilter.GaussianBlur(20))
+    img.thumbnail(target_size, Image.Resampling.LANCZOS)
+    offset = ((target_size[0] - img.width) // 2, (target_size[1] - img.height) // 2)
+    bg.paste(img, offset)
+    return np.asarray(bg)
+
+
+class StillBuffer:
+    """N RGB stills of one size in a single (optionally shared) memory block"""
+
+    def __init__(self, count, target_size, shared=True):
+        width, height = target_size
+        self.shape = (count, height, width, 3)
+        self.shm = None
+        if shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)))
+            self.array = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        else:
+            self.array = np.empty(self.shape, dtype=np.uint8)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __iter__(self):
+        return (self.array[i] for i in range(len(self)))
+
+    def close(self):
+        """Release the shared block; views handed out must no longer be used"""
+        self.array = None
+        if self.shm is not None:
+            try:
+                self.shm.close()
+            except BufferError:
+                pass  # Clips still hold views; the mapping is released with them
+            self.shm.unlink()
+            self.shm = None
+
+
+def _prepare_into_shared(image_path, target_size, shm_name, shape, index):
+    """Pool task: prepare one still directly into the shared block"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # The parent owns the block; keep this process's tracker from unlinking it
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    try:
+        stills = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        stills[index] = prepare_base_image(image_path, target_size)
+        del stills
+    finally:
+        shm.close()
+
+
+_pool = None
+_pool_workers = None
+
+
+def _get_pool(workers):
+    """Process pool kept for the life of this process, so tasks don't pay its startup"""
+    global _pool, _pool_workers
+    if _pool is not None and _pool_workers != workers:
+        _discard_pool()
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_workers = workers
+    return _pool
+
+
+def _discard_pool():
+    """Shut the pool down so the next _get_pool starts a fresh one"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+    _pool_workers = None
+
+
+def _prepare_in_pool(image_paths, target_size, stills, workers):
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(_prepare_into_shared, path, target_size, stills.shm.name, stills.shape, index)
+        for index, path in enumerate(image_paths)
+    ]
+    for future in futures:
+        future.result()
+
+
+def prepare_stills(image_paths, target_size, workers=DEFAULT_WORKERS):
+    """Prepare all stills, in parallel when workers > 1, and return a StillBuffer"""
+    if workers <= 1 or len(image_paths) <= 1:
+        stills = StillBuffer(len(image_paths), target_size, shared=False)
+        for index, path in enumerate(image_paths):
+            stills.array[index] = prepare_base_image(path, target_size)
+        return stills
+
+    stills = StillBuffer(len(image_paths), target_size)
+    try:
+        try:
+            _prepare_in_pool(image_paths, target_size, stills, workers)
+        except BrokenProcessPool:
+            # A prep child died (e.g. OOM-killed), which breaks the whole pool;
+            # retry once on a fresh one rather than failing every later task
+            print("Image prep pool broke, restarting it")
+            _discard_pool()
+            _prepare_in_pool(image_paths, target_size, stills, workers)
+    except BaseException:
+        stills.close()
+        raise
+    return stills
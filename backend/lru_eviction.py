@@ -0,0 +1,54 @@
+"""
+Size-Capped Cache Eviction for Video Generator
+==============================================
+
+The asset, render, transcript and caption sprite caches are plain directories
+whose files' mtimes say when they were last used (each cache touches a file
+on a hit). evict_lru trims such a directory back under a byte budget, least
+recently used first.
+
+Usage:
+    from lru_eviction import evict_lru
+
+    evict_lru(cache_dir, max_bytes, skip=lambda name: name.endswith(".tmp"))
+"""
+
+import os
+
+
+def evict_lru(cache_dir, max_bytes, skip=None, expired=None):
+    """Remove files under cache_dir, oldest mtime first, until they total at most max_bytes.
+
+    skip(name) leaves a file out entirely (e.g. one still being written);
+    expired(path, stat) marks a file to remove whatever the total.
+    """
+    files = []
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            if skip is not None and skip(name):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if expired is not None and expired(path, stat):
+                _remove(path)
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if _remove(path):
+            total -= size
+
+
+def _remove(path):
+    try:
+        # A task holding a hardlink to the file keeps its copy
+        os.remove(path)
+        return True
+    except OSError:
+        return False
@@ -1,7 +1,30 @@
-def generate_video_from_drive(folder_id, on_video_title, output_file, task_path):
+def generate_video_from_drive(folder_id, on_video_title, output_file, task_path,
+                              render_backend="moviepy", caption_mode="clips",
+                              transcription_engine=None, on_progress=None, seed=None,
+                              on_assets=None, renditions=None, folder_files=None):
     """
     Generate video with enhanced captions from Google Drive folder.
     
+    render_backend selects how frames are produced: "moviepy" composites clips in
+    Python, "ffmpeg" compiles the same timeline into one ffmpeg filtergraph,
+    "segments" renders each still's slice in its own process and joins the
+    pieces by stream copy.
+    caption_mode "clips" draws one overlay per word, "ass" writes an ASS subtitle
+    script that libass burns in during the encode.
+    transcription_engine is an "engine:model" spec from transcription_engines
+    (default TRANSCRIBE_ENGINE or "whisper:base").
+    on_progress, if given, is called as on_progress(stage, percent, timings)
+    whenever a render stage starts or finishes.
+    seed picks the title font and caption style (render_style); the same seed
+    always gives the same look. It defaults to a hash of folder_id and title.
+    on_assets, if given, is called with the Drive file listing the render uses.
+    folder_files, if given, is the folder's Drive listing already fetched by
+    the caller; the folder is then not listed again.
+    renditions lists extra outputs from renditions ("master", "preview",
+    "thumbnail"), written next to output_file. The moviepy and ffmpeg backends
+    encode them all from the single frame pass; the segments backend derives
+    them from output_file in one extra decode.
+    
     AUTHENTICATION SETUP (Choose one method):
     
     METHOD 1 - SERVICE ACCOUNT (Recommended - No browser popups):
@@ -18,36 +41,46 @@ def generate_video_from_drive(folder_id, on_video_title, output_file, task_path)
     2. Enable Google Drive API
     3. Create OAuth 2.0 credentials (Desktop application)
     4. Download and save as 'credentials.json'
-    5. The script will open browser for initial authentication
-    6. Tokens will be saved and refreshed automatically
+    5. Run 'python drive_auth.py' once to authenticate in the browser
+    6. The token is saved to 'token.json' and refreshed automatically
     """
     import os
     import glob
     import shutil
     import requests
-    import whisper
     import numpy as np
     import pickle
     import io
     import time
     import uuid
     import hashlib
-    import random  # Added for random font selection
-    from PIL import Image, ImageDraw, ImageFont, ImageFilter
+    import json
+    import multiprocessing
+    from PIL import Image, ImageDraw, ImageFont
     from moviepy.editor import (
         ImageClip, concatenate_videoclips, AudioFileClip, CompositeVideoClip
     )
     from moviepy.config import change_settings
     import moviepy.config as moviepy_config
     from moviepy.video.VideoClip import TextClip
-    from googleapiclient.discovery import build
-    from googleapiclient.http import MediaIoBaseDownload
-    from google.oauth2 import service_account
     from caption_styles import CaptionStyleManager  # Import the caption styles module
+    from transitions import blur_transition  # Cached blur in/out for the stills
+    from static_layers import StaticLayer
+    from ffmpeg_backend import render_with_ffmpeg, ass_filter
+    from segment_render import render_segments
+    from caption_blitter import CaptionBlitClip
+    from transcription_service import transcribe_via_service
+    from transcription_engines import DEFAULT_ENGINE, get_engine, parse_engine_spec
+    from transcript_cache import TranscriptCache, hash_file
+    from drive_download import DriveDownloader
+    from drive_auth import get_drive_session
+    from asset_cache import AssetCache
+    from pipeline import StageGraph
+    from metrics import timed, record_encode_fps
+    from image_prep import prepare_stills
+    from render_style import default_seed, resolve_render_style
+    from renditions import parse_renditions, rendition_outputs, write_renditions, transcode_renditions
 
-    SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
-    SERVICE_ACCOUNT_FILE = 'service-account-key.json'  # Your service account key file
-    
     # Create unique session ID for this process to avoid conflicts
     session_id = str(uuid.uuid4())[:8]
     process_hash = hashlib.md5(f"{folder_id}_{on_video_title}_{time.time()}".encode()).hexdigest()[:8]
@@ -66,151 +99,25 @@ def generate_video_from_drive(folder_id, on_video_title, output_file, task_path)
     
     custom_font = "Roboto-Bold.ttf"
     
-    # Random font selection from scary_fonts folder
-    scary_fonts_folder = "scary_fonts"
-    
-    def select_random_font():
-        """Select a random font from the scary_fonts folder"""
-        try:
-            # Get all .ttf files from the scary_fonts folder
-            font_files = glob.glob(os.path.join(scary_fonts_folder, "*.ttf"))
-            
-            if not font_files:
-                print(f"No .ttf files found in {scary_fonts_folder} folder. Using fallback font.")
-                return custom_font
-            
-            # Select random font
-            selected_font = random.choice(font_files)
-            print(f"Selected random font: {os.path.basename(selected_font)}")
-            return selected_font
-            
-        except Exception as e:
-            print(f"Error selecting random font: {e}. Using fallback font.")
-            return custom_font
-    
-    # Select random title font at the start
-    title_font = select_random_font()
+    # Title font and caption style are "random" but reproducible from the seed
+    if seed is None:
+        seed = default_seed(folder_id, on_video_title)
+    render_style = resolve_render_style(seed)
+    title_font = render_style["title_font"]
+    caption_style_index = render_style["caption_style"]
     
     target_resolution = (576, 1024)
-
-    def authenticate_drive():
-        """
-        Authenticate using service account - no browser popup needed!
-        This method uses a service account key file for persistent authentication.
-        """
-        try:
-            # Method 1: Service Account Authentication (Recommended)
-            credentials = service_account.Credentials.from_service_account_file(
-                SERVICE_ACCOUNT_FILE, 
-                scopes=SCOPES
-            )
-            return build('drive', 'v3', credentials=credentials)
-        
-        except FileNotFoundError:
-            print(f"Service account file '{SERVICE_ACCOUNT_FILE}' not found.")
-            print("Falling back to OAuth authentication...")
-            
-            # Method 2: Fallback to improved OAuth with unique token files
-            from google_auth_oauthlib.flow import InstalledAppFlow
-            from google.auth.transport.requests import Request
-            
-            creds = None
-            token_file = f'token_{unique_id}.json'  # Unique token file for this process
-            
-            # Load existing credentials
-            if os.path.exists(token_file):
-                try:
-                    from google.oauth2.credentials import Credentials
-                    creds = Credentials.from_authorized_user_file(token_file, SCOPES)
-                except Exception as e:
-                    print(f"Error loading credentials: {e}")
-                    creds = None
-            
-            # Try loading shared token if unique one doesn't exist
-            if not creds and os.path.exists('token.json'):
-                try:
-                    from google.oauth2.credentials import Credentials
-                    creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-                    # Save copy for this process
-                    if creds and creds.valid:
-                        with open(token_file, 'w') as token:
-                            token.write(creds.to_json())
-                except Exception as e:
-                    print(f"Error loading shared credentials: {e}")
-                    creds = None
-            
-            # If credentials are invalid or don't exist, get new ones
-            if not creds or not creds.valid:
-                if creds and creds.expired and creds.refresh_token:
-                    try:
-                        creds.refresh(Request())
-                        print("Successfully refreshed credentials!")
-                    except Exception as e:
-                        print(f"Error refreshing credentials: {e}")
-                        creds = None
-                
-                if not creds:
-                    # Use unique port for each process
-                    import random
-                    port = 8080 + random.randint(1, 100)
-                    
-                    flow = InstalledAppFlow.from_client_secrets_file(
-                        'credentials.json', 
-                        SCOPES,
-                        redirect_uri=f'http://localhost:{port}'
-                    )
-                    # Request offline access for refresh tokens
-                    creds = flow.run_local_server(
-                        port=port,
-                        access_type='offline',
-                        prompt='consent'  # Forces consent screen to get refresh token
-                    )
-                
-                # Save the credentials for next time
-                with open(token_file, 'w') as token:
-                    token.write(creds.to_json())
-                print(f"Credentials saved to {token_file}")
-            
-            return build('drive', 'v3', credentials=creds)
-
-    def download_drive_folder(folder_id, image_folder, audio_filename):
-        service = authenticate_drive()
-        os.makedirs(image_folder, exist_ok=True)
-        query = f"'{folder_id}' in parents and trashed = false"
-        results = service.files().list(q=query, fields="files(id, name, mimeType)").execute()
-        files = results.get('files', [])
-
-        for file in files:
-            file_id = file['id']
-            name = file['name']
-            mime = file['mimeType']
-            base, ext = os.path.splitext(name)
-
-            if mime == 'image/png':
-                if ext.lower() != ".png":
-                    name = f"{base}.png"
-                out_path = os.path.join(image_folder, name)
-            elif mime in ['audio/mpeg', 'application/octet-stream']:
-                out_path = audio_filename
-            else:
-                continue
-
-            request = service.files().get_media(fileId=file_id)
-            with open(out_path, 'wb') as f:
-                downloader = MediaIoBaseDownload(f, request)
-                done = False
-                while not done:
-                    _, done = downloader.next_chunk()
-
-    def prepare_base_image(image_path, target_size):
-        img = Image.open(image_path).convert("RGB")
-        bg = img.resize(target_size).filter(ImageFilter.GaussianBlur(20))
-        img.thumbnail(target_size, Image.Resampling.LANCZOS)
-        offset = ((target_size[0] - img.width) // 2, (target_size[1] - img.height) // 2)
-        bg.paste(img, offset)
-        final_path = image_path.replace(".png", f"_noborder_{unique_id}.png")
-        bg.save(final_path)
-        return final_path
+    image_count = 8  # Stills per short, image_1.png ... image_8.png
+    engine_spec = ":".join(parse_engine_spec(transcription_engine or DEFAULT_ENGINE))
+    outputs = rendition_outputs(output_file, parse_renditions(renditions))
+
+    def make_drive_downloader():
+        # Paged listing, then all files fetched in parallel over one connection pool;
+        # files already on this host are linked from the asset cache instead.
+        # Credentials and the pooled session are built once per worker process.
+        with timed("auth"):
+            session = get_drive_session()
+        return DriveDownloader(session, asset_cache=AssetCache())
 
     def create_title_overlay(title, size):
         overlay = Image.new("RGBA", size, (0, 0, 0, 0))
@@ -251,26 +158,28 @@ def generate_video_from_drive(folder_id, on_video_title, output_file, task_path)
         overlay.save(title_path)
         return title_path
 
-    def blur_transition(clip, blur_duration=1.0):
-        def fl(gf, t):
-            frame = gf(t)
-            alpha = 1.0
-            if t < blur_duration:
-                alpha = t / blur_duration
-            elif t > clip.duration - blur_duration:
-                alpha = (clip.duration - t) / blur_duration
-            radius = int(20 * (1 - alpha))
-            pil_frame = Image.fromarray(frame)
-            if radius > 0:
-                pil_frame = pil_frame.filter(ImageFilter.GaussianBlur(radius))
-            return np.array(pil_frame)
-        return clip.fl(fl)
+    def transcribe_audio(audio_path):
+        try:
+            # The host-wide service keeps the model resident between renders
+            return transcribe_via_service(audio_path, engine_spec)
+        except (OSError, EOFError, RuntimeError, multiprocessing.AuthenticationError) as e:
+            print(f"Transcription service unavailable ({e}). Loading {engine_spec} in this process...")
+
+        return get_engine(engine_spec).transcribe(audio_path)
 
     def generate_captions(audio_path):
+        # Re-renders of the same narration reuse the stored transcript
+        transcript_cache = TranscriptCache()
+        audio_hash = hash_file(audio_path)
+        segments = transcript_cache.get(audio_hash, engine_spec)
+        if segments is not None:
+            print("Using cached transcript for this audio")
+            return segments
+
         print("Transcribing audio with Whisper...")
-        model = whisper.load_model("base")
-        result = model.transcribe(audio_path)
-        return result["segments"]
+        segments = transcribe_audio(audio_path)
+        transcript_cache.put(audio_hash, engine_spec, segments)
+        return segments
 
     def create_typewriter_word_clip(word, start_time, duration, video_width):
         """Typewriter effect - letters appear one by one"""
@@ -463,7 +372,6 @@ def generate_video_from_drive(folder_id, on_video_title, output_file, task_path)
     # Configure MoviePy settings with unique temp directory
     moviepy_config.change_settings({
         "FFMPEG_BINARY": "ffmpeg",
-        "IMAGEMAGICK_BINARY": r"C:\Program Files\ImageMagick-7.1.1-Q16-HDRI\magick.exe",
         "TEMP_DIR": temp_dir  # Use unique temp directory
     })
     
@@ -474,107 +382,247 @@ def generate_video_from_drive(folder_id, on_video_title, output_file, task_path)
         except:
             pass
 
-    # Download content from Google Drive
-    download_drive_folder(folder_id, images_folder, audio_path)
-
-    # Prepare images
-    image_paths = []
-    for i in range(1, 9):
-        path = os.path.join(images_folder, f"image_{i}.png")
-        styled = prepare_base_image(path, target_resolution)
-        image_paths.append(styled)
-
-    # Setup audio and timing
-    audio = AudioFileClip(audio_path)
-    video_duration = audio.duration
-    clip_duration = video_duration / len(image_paths)
-
-    # Create title overlay
-    title_overlay_path = create_title_overlay(on_video_title, target_resolution)
-    title_clip = ImageClip(title_overlay_path).set_duration(clip_duration).set_position(("center", "top"))
-
-    # Create main video clips
-    clips = []
-    for path in image_paths:
-        bg_clip = ImageClip(path).set_duration(clip_duration).resize(target_resolution)
-        bg_blurred = blur_transition(bg_clip)
-        comp = CompositeVideoClip([bg_blurred, title_clip.set_duration(clip_duration)])
-        clips.append(comp)
-
-    # Combine video clips
-    video = concatenate_videoclips(clips, method="compose").set_fps(24)
-    video_with_audio = video.set_audio(audio.set_duration(video.duration))
-
-    # Generate captions with optimized performance using modular caption styles
-    print("Generating optimized captions...")
-    segments = generate_captions(audio_path)
-    
     # Initialize caption style manager
     caption_manager = CaptionStyleManager(target_resolution, custom_font)
-    
-    # Create caption clips with random style
-    caption_clips = caption_manager.create_caption_clips(segments, target_resolution[0])
-    
-    # Combine everything
-    final_video = CompositeVideoClip([video_with_audio] + caption_clips)
-
-    # Export final video
-    print("Exporting final video with animated captions...")
-    final_video.write_videofile(
-        output_file, 
-        fps=24, 
-        codec="libx264", 
-        audio_codec="aac",
-        preset="medium",
-        ffmpeg_params=["-crf", "23"]  # Good quality balance
-    )
+    downloader = None
+    stills = None
+
+    # ---- Render stages; each one starts as soon as its inputs exist ----
+
+    def list_stage():
+        nonlocal downloader
+        downloader = make_drive_downloader()
+        jobs = downloader.plan_folder(folder_id, images_folder, audio_path, files=folder_files)
+        if on_assets:
+            on_assets([file for file, _ in jobs])
+        return jobs
+
+    def download_audio_stage(jobs):
+        return downloader.fetch_files([job for job in jobs if job[1] == audio_path])
+
+    def download_images_stage(jobs):
+        return downloader.fetch_files([job for job in jobs if job[1] != audio_path])
+
+    def prepare_images_stage(_):
+        nonlocal stills
+        # Styled stills stay in memory, prepared in parallel on a process pool
+        image_paths = [os.path.join(images_folder, f"image_{i}.png") for i in range(1, image_count + 1)]
+        stills = prepare_stills(image_paths, target_resolution)
+        return stills
+
+    def audio_stage(_):
+        # Setup audio and timing
+        audio = AudioFileClip(audio_path)
+        clip_duration = audio.duration / image_count
+        return audio, clip_duration
+
+    def transcribe_stage(_):
+        # Generate captions with optimized performance using modular caption styles
+        print("Generating optimized captions...")
+        return generate_captions(audio_path)
+
+    def title_stage():
+        return create_title_overlay(on_video_title, target_resolution)
+
+    def compose_stage(stills, audio_info, title_overlay_path, segments):
+        audio, clip_duration = audio_info
+
+        if render_backend in ("ffmpeg", "segments"):
+            audio.close()
+            with timed("caption_build"):
+                caption_words = caption_manager.plan_caption_words(segments, caption_style_index)
+            return {"caption_words": caption_words}
+
+        # The title never changes, so it is baked into each still's blur levels once
+        title_layer = StaticLayer.from_png(title_overlay_path)
+
+        # Create main video clips
+        clips = []
+        for still in stills:
+            bg_clip = ImageClip(still).set_duration(clip_duration)
+            clips.append(blur_transition(bg_clip, overlays=[title_layer]))
+
+        # Combine video clips; all are full-frame, so they are chained, not composited
+        video = concatenate_videoclips(clips, method="chain").set_fps(24)
+        video_with_audio = video.set_audio(audio.set_duration(video.duration))
+
+        ffmpeg_params = ["-crf", "23"]  # Good quality balance
+        ffmpeg_params += ["-movflags", "+faststart"]  # moov atom first so playback can start early
+        video_filter = None
+        if caption_mode == "ass":
+            # Captions are burned in by libass during the encode
+            with timed("caption_build"):
+                ass_path = caption_manager.create_ass_subtitles(
+                    segments, os.path.join(temp_dir, f"captions_{unique_id}.ass"), caption_style_index
+                )
+            fonts_dir = os.path.dirname(os.path.abspath(custom_font))
+            video_filter = ass_filter(ass_path, fonts_dir)
+            ffmpeg_params += ["-vf", video_filter]
+            final_video = video_with_audio
+        else:
+            # Create caption sprites in the seed-selected style
+            with timed("caption_build"):
+                caption_sprites = caption_manager.create_caption_sprites(
+                    caption_manager.plan_caption_words(segments, caption_style_index)
+                )
+            
+            # Combine everything; only the captions active at t are blended, in place, per frame
+            final_video = CaptionBlitClip(video_with_audio, caption_sprites)
+
+        return {"final_video": final_video, "ffmpeg_params": ffmpeg_params, "video_filter": video_filter}
+
+    def encode_output(composition, stills, clip_duration, title_overlay_path):
+        # Thumbnail from the middle of the first still, clear of its blur-in
+        thumbnail_time = clip_duration / 2
+
+        if render_backend == "ffmpeg":
+            # The filtergraph splits its output to every rendition itself
+            encode_with_backend(composition, stills, clip_duration, title_overlay_path,
+                                thumbnail_time)
+            return output_file
+
+        if render_backend == "segments":
+            encode_with_backend(composition, stills, clip_duration, title_overlay_path)
+            if len(outputs) > 1:
+                transcode_renditions(
+                    output_file, outputs[1:], target_resolution, clip_duration * image_count,
+                    thumbnail_time=thumbnail_time
+                )
+            return output_file
+
+        if len(outputs) > 1:
+            # Every rendition is encoded from the same frames, generated once
+            write_renditions(
+                composition["final_video"], audio_path, outputs,
+                video_filter=composition["video_filter"], thumbnail_time=thumbnail_time
+            )
+            return output_file
+
+        # Export final video
+        print("Exporting final video with animated captions...")
+        composition["final_video"].write_videofile(
+            output_file, 
+            fps=24, 
+            codec="libx264", 
+            audio_codec="aac",
+            preset="medium",
+            ffmpeg_params=composition["ffmpeg_params"]
+        )
+        return output_file
+
+    def encode_with_backend(composition, stills, clip_duration, title_overlay_path, thumbnail_time=0.0):
+        if render_backend == "ffmpeg":
+            print("Exporting final video with ffmpeg filtergraph...")
+            render_with_ffmpeg(
+                stills,
+                title_overlay_path,
+                audio_path,
+                clip_duration,
+                composition["caption_words"],
+                caption_manager,
+                output_file,
+                os.path.join(temp_dir, "ffmpeg"),
+                caption_mode=caption_mode,
+                outputs=outputs if len(outputs) > 1 else None,
+                thumbnail_time=thumbnail_time
+            )
+            return output_file
+
+        if render_backend == "segments":
+            print("Exporting final video in parallel segments...")
+            render_segments(
+                stills,
+                title_overlay_path,
+                audio_path,
+                clip_duration,
+                composition["caption_words"],
+                caption_manager,
+                output_file,
+                os.path.join(temp_dir, "segments"),
+                caption_mode=caption_mode
+            )
+            return output_file
+
+    def encode_stage(composition, stills, audio_info, title_overlay_path):
+        _, clip_duration = audio_info
+        start = time.perf_counter()
+        encode_output(composition, stills, clip_duration, title_overlay_path)
+        # Output frames per second of encode wall time
+        frames = int(clip_duration * image_count * 24)
+        record_encode_fps(render_backend, frames / max(time.perf_counter() - start, 1e-6))
+        return output_file
+
+    def report_stage(name, event):
+        if on_progress:
+            # Several stages can run at once; report all of them
+            stage = ",".join(graph.running) or name
+            on_progress(stage, graph.progress() * 100, dict(graph.timings))
+
+    # Weights are each stage's rough share of a render, for percent complete
+    graph = StageGraph(on_stage=report_stage)
+    graph.add("list", list_stage, weight=1)
+    graph.add("download_audio", download_audio_stage, deps=["list"], weight=3)
+    graph.add("download_images", download_images_stage, deps=["list"], weight=5)
+    graph.add("prepare_images", prepare_images_stage, deps=["download_images"], weight=2)
+    graph.add("audio", audio_stage, deps=["download_audio"], weight=1)
+    graph.add("transcribe", transcribe_stage, deps=["download_audio"], weight=20)
+    graph.add("title", title_stage, weight=1)
+    graph.add("compose", compose_stage, deps=["prepare_images", "audio", "title", "transcribe"], weight=2)
+    graph.add("encode", encode_stage, deps=["compose", "prepare_images", "audio", "title"], weight=65)
+
+    try:
+        graph.run()
+    finally:
+        if stills is not None:
+            stills.close()
+        stage_timings = graph.timings
+        print("Stage timings (s): " + ", ".join(
+            f"{name}={timing['seconds']}" for name, timing in stage_timings.items()
+        ))
+        with open(os.path.join(task_dir, "timings.json"), "w") as f:
+            json.dump(stage_timings, f, indent=2)
+        if on_progress:
+            on_progress(None, graph.progress() * 100, dict(stage_timings))
 
     # Clean up temporary files for this specific process
     print(f"Cleaning up temporary files for session {unique_id}...")
     
-    # Clean caption temp files
-    for file in glob.glob(os.path.join(temp_dir, f"temp_caption_*_{unique_id}.png")):
-        try:
-            os.remove(file)
-        except:
-            pass
-    
-    # Clean title overlay
-    title_overlay_path = os.path.join(temp_dir, f"title_overlay_{unique_id}.png")
-    if os.path.exists(title_overlay_path):
-        try:
-            os.remove(title_overlay_path)
-        except:
-            pass
+    with timed("cleanup"):
+        # Clean caption temp files
+        for file in glob.glob(os.path.join(temp_dir, f"temp_caption_*_{unique_id}.png")):
+            try:
+                os.remove(file)
+            except:
+                pass
     
-    # Clean audio file
-    if os.path.exists(audio_path):
-        try:
-            os.remove(audio_path)
-        except:
-            pass
+        # Clean title overlay
+        title_overlay_path = os.path.join(temp_dir, f"title_overlay_{unique_id}.png")
+        if os.path.exists(title_overlay_path):
+            try:
+                os.remove(title_overlay_path)
+            except:
+                pass
     
-    # Clean images folder
-    if os.path.exists(images_folder):
-        try:
-            shutil.rmtree(images_folder)
-        except:
-            pass
+        # Clean audio file
+        if os.path.exists(audio_path):
+            try:
+                os.remove(audio_path)
+            except:
+                pass
     
-    # Clean temp directory
-    if os.path.exists(temp_dir):
-        try:
-            shutil.rmtree(temp_dir)
-        except:
-            pass
+        # Clean images folder
+        if os.path.exists(images_folder):
+            try:
+                shutil.rmtree(images_folder)
+            except:
+                pass
     
-    # Clean OAuth token file for this process (keep shared token.json)
-    token_file = f'token_{unique_id}.json'
-    if os.path.exists(token_file):
-        try:
-            os.remove(token_file)
-        except:
-            pass
+        # Clean temp directory
+        if os.path.exists(temp_dir):
+            try:
+                shutil.rmtree(temp_dir)
+            except:
+                pass
     
     print(f"Video generation completed successfully! Output: {output_file}")
     return output_file
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+Render Metrics for Video Generator
+==================================
+
+Minimal Prometheus instrumentation (text exposition format 0.0.4), without
+the prometheus_client dependency.
+
+Renders run in worker processes, so metrics are collected in two steps:
+
+1. Inside a render, timed("auth") / record_stage(...) / record_encode_fps(...)
+   add observations to a per-process list. generate_video_task drains that
+   list when the task ends and saves it on the task row.
+2. The web process feeds each finished task's stage timings and saved
+   observations into the histograms (observe_task). It also sets the queue
+   and worker gauges when /metrics is scraped.
+
+Usage:
+    from metrics import timed
+
+    with timed("cleanup"):
+        ...
+
+    # app.py
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+TASK_BUCKETS = (10, 20, 30, 45, 60, 90, 120, 180, 240, 300, 450, 600, 900, 1800)
+FPS_BUCKETS = (5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self, name=None):
+        name = name or self.name
+        return [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        # Text format 0.0.4 names the family after its _total sample
+        lines = self.header(f"{self.name}_total")
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}_total{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def replace(self, values):
+        """Set every labelled value at once, dropping label sets not in values"""
+        with self._lock:
+            self._values = {tuple(str(v) for v in key): value for key, value in values.items()}
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=STAGE_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn):
+        """fn() runs before each render, to refresh gauges"""
+        self._collectors.append(fn)
+
+    def render(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "render_stage_seconds", "Wall time of each render stage", ["stage"], STAGE_BUCKETS
+))
+TASK_SECONDS = REGISTRY.register(Histogram(
+    "render_task_seconds", "Wall time of a whole render", [], TASK_BUCKETS
+))
+ENCODE_FPS = REGISTRY.register(Histogram(
+    "render_encode_fps", "Frames encoded per second of the encode stage", ["backend"], FPS_BUCKETS
+))
+TASKS = REGISTRY.register(Counter(
+    "render_tasks", "Finished render tasks by outcome", ["state"]
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge("render_queue_depth", "Render jobs waiting for a worker"))
+ACTIVE_WORKERS = REGISTRY.register(Gauge("render_active_workers", "Render workers running a job"))
+WORKERS = REGISTRY.register(Gauge("render_workers", "Size of the render worker pool"))
+WORKER_RSS = REGISTRY.register(Gauge(
+    "render_worker_rss_bytes", "Resident memory of each render worker process", ["pid"]
+))
+PROCESS_RSS = REGISTRY.register(Gauge("process_resident_memory_bytes", "Resident memory of the web process"))
+
+
+def process_rss(pid=None):
+    """Resident set size of pid (default: this process) in bytes, or None"""
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass  # No /proc (not Linux) or the process is gone
+    return None
+
+
+# ---- Per-process observations made during a render ----
+
+_observations = {"stages": [], "encode_fps": []}
+_observations_lock = threading.Lock()
+
+
+def record_stage(name, seconds):
+    with _observations_lock:
+        _observations["stages"].append([name, round(seconds, 3)])
+
+
+def record_encode_fps(backend, fps):
+    with _observations_lock:
+        _observations["encode_fps"].append([backend, round(fps, 2)])
+
+
+@contextmanager
+def timed(name):
+    """Record how long the block takes as render stage `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def drain_observations():
+    """Observations recorded in this process since the last drain"""
+    global _observations
+    with _observations_lock:
+        drained, _observations = _observations, {"stages": [], "encode_fps": []}
+    return drained
+
+
+def observe_task(task):
+    """Feed a finished task row into the histograms (web process)"""
+    observations = task.get("metrics") or {}
+    # Renders served from the render cache are counted apart from real renders
+    TASKS.inc(state="cached" if observations.get("cached") else task["state"])
+    for stage, timing in (task.get("timings") or {}).items():
+        if stage == "total":
+            TASK_SECONDS.observe(timing["seconds"])
+        else:
+            STAGE_SECONDS.observe(timing["seconds"], stage=stage)
+    for stage, seconds in observations.get("stages", []):
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    for backend, fps in observations.get("encode_fps", []):
+        ENCODE_FPS.observe(fps, backend=backend)
@@ -0,0 +1,122 @@
+"""
+Stage Pipeline for Video Generator
+==================================
+
+A small dependency-graph executor for the render stages. Each stage is a
+function plus the names of the stages it needs; a stage is started on a thread
+pool as soon as all of its inputs exist, so independent work overlaps (e.g.
+Whisper starts once the audio is downloaded while the images are still
+arriving and being styled).
+
+Every stage's start/end time relative to the run and its duration are recorded
+in StageGraph.timings. Stages can carry a weight (their rough share of a
+run's wall time) so progress() can report a completion fraction.
+
+Usage:
+    from pipeline import StageGraph
+
+    graph = StageGraph()
+    graph.add("download", download)
+    graph.add("transcribe", transcribe, deps=["download"])
+    results = graph.run()
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class StageGraph:
+    """Runs stages as soon as the stages they depend on have finished"""
+
+    def __init__(self, max_workers=4, on_stage=None):
+        self.max_workers = max_workers
+        self.on_stage = on_stage  # Called as on_stage(name, event) with event "start"/"end"
+        self._stages = {}
+        self._weights = {}
+        self.results = {}
+        self.timings = {}
+        self.running = []
+
+    def add(self, name, fn, deps=(), weight=1.0):
+        """Register a stage; fn is called with the results of deps, in order"""
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' already registered")
+        self._stages[name] = (fn, tuple(deps))
+        self._weights[name] = weight
+        return self
+
+    def progress(self):
+        """Fraction (0..1) of the total stage weight that has finished"""
+        total = sum(self._weights.values())
+        if not total:
+            return 0.0
+        done = sum(weight for name, weight in self._weights.items() if name in self.results)
+        return done / total
+
+    def _check(self):
+        for name, (_, deps) in self._stages.items():
+            for dep in deps:
+                if dep not in self._stages:
+                    raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+
+    def _run_stage(self, name, fn, args, origin):
+        self.running.append(name)
+        if self.on_stage:
+            self.on_stage(name, "start")
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+            self.results[name] = result
+            return result
+        finally:
+            end = time.perf_counter()
+            self.timings[name] = {
+                "start": round(start - origin, 3),
+                "end": round(end - origin, 3),
+                "seconds": round(end - start, 3),
+            }
+            self.running.remove(name)
+            if self.on_stage:
+                self.on_stage(name, "end")
+
+    def run(self):
+        """Run every stage and return {name: result}; the first failure is re-raised"""
+        self._check()
+        origin = time.perf_counter()
+        pending = dict(self._stages)
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                if error is None:
+                    ready = [
+                        name for name, (_, deps) in pending.items()
+                        if all(dep in self.results for dep in deps)
+                    ]
+                    for name in ready:
+                        fn, deps = pending.pop(name)
+                        args = [self.results[dep] for dep in deps]
+                        running[pool.submit(self._run_stage, name, fn, args, origin)] = name
+
+                if not running:
+                    if pending and error is None:
+                        raise ValueError(f"Stages can never run (dependency cycle): {', '.join(pending)}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        # Let running stages finish, start nothing new
+                        if error is None:
+                            error = e
+                        pending.clear()
+
+        total = round(time.perf_counter() - origin, 3)
+        self.timings["total"] = {"start": 0.0, "end": total, "seconds": total}
+        if error is not None:
+            raise error
+        return self.results
@@ -0,0 +1,129 @@
+"""
+Render Cache for Video Generator
+================================
+
+Host-wide store of finished renders, keyed by everything that determines the
+output: the checksums of the Drive assets, the title, the seed-resolved title
+font and caption style, and the encoder settings. A request whose key is
+already stored gets the stored MP4 hardlinked into its task folder instead of
+being rendered again. The renditions of a render (master, preview, thumbnail)
+are stored under the same key with their own suffix, so a request for a
+subset of them can reuse a render that produced more.
+
+Bump RENDER_CACHE_VERSION when a change to the render code alters the output
+for the same inputs.
+
+Usage:
+    from render_cache import RenderCache, render_key, render_settings
+
+    settings = render_settings(render_backend, caption_mode, engine_spec)
+    key = render_key(drive_files, title, style, settings)
+    cache = RenderCache()
+    cached = cache.lookup(key)
+    if cached is None:
+        render(output_path)
+        cache.store(key, output_path)
+        cache.store(key, master_path, RENDITIONS["master"].suffix)
+"""
+
+import os
+import json
+import shutil
+import hashlib
+
+from asset_cache import AssetCache
+from lru_eviction import evict_lru
+from drive_download import output_path_for
+
+RENDER_CACHE_VERSION = 3
+DEFAULT_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", "render_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", 20 * 1024 * 1024 * 1024))
+
+
+def render_settings(render_backend, caption_mode, engine_spec):
+    """Settings that change the output; the fixed values mirror main_generator"""
+    return {
+        "render_backend": render_backend,
+        "caption_mode": caption_mode,
+        "transcription_engine": engine_spec,
+        "resolution": [576, 1024],
+        "image_count": 8,
+        "fps": 24,
+        "codec": "libx264",
+        "preset": "medium",
+        "crf": 23,
+    }
+
+
+def asset_fingerprint(files):
+    """Sorted (name, content key) of the listed Drive files a render uses"""
+    return sorted(
+        (file["name"], AssetCache.key_for(file))
+        for file in files
+        if output_path_for(file, "", "") is not None
+    )
+
+
+def render_key(files, title, style, settings):
+    """SHA-256 over the render's inputs and settings"""
+    payload = {
+        "version": RENDER_CACHE_VERSION,
+        "assets": asset_fingerprint(files),
+        "title": title,
+        "title_font": os.path.basename(style["title_font"]),
+        "caption_style": style["caption_style"],
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def request_key(folder_id, title, seed, settings):
+    """Identity of a /start request, for attaching duplicates to a running task"""
+    payload = {"folder_id": folder_id, "title": title, "seed": seed, "settings": settings}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class RenderCache:
+    """Finished MP4s by render key, trimmed least-recently-used to a size cap"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key, suffix=".mp4"):
+        """Cached file for key; renditions other than the short use their own suffix"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}{suffix}")
+
+    def lookup(self, key, suffix=".mp4"):
+        """Cached output for key, or None"""
+        path = self.path(key, suffix)
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path, None)  # Mark as recently used
+        except OSError:
+            pass
+        return path
+
+    def store(self, key, output_path, suffix=".mp4"):
+        """Add a finished render; the task keeps its own copy"""
+        path = self.path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.link(output_path, tmp_path)
+        except OSError:
+            shutil.copyfile(output_path, tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    @staticmethod
+    def link_into(cached_path, out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        return AssetCache.link_into(cached_path, out_path)
+
+    def evict(self):
+        """Remove least recently used renders until the cache is under max_bytes"""
+        evict_lru(self.cache_dir, self.max_bytes, skip=lambda name: name.endswith(".tmp"))
@@ -0,0 +1,175 @@
+"""
+Render Queue for Video Generator
+================================
+
+Admission control for render jobs. A fixed number of worker processes (sized
+from the CPU count and physical memory, since one render runs Whisper and
+libx264 side by side) take jobs from a priority queue; jobs of equal priority
+run first-in first-out. When the queue is at its configured depth, new jobs
+are refused with a Retry-After estimate instead of overloading the host.
+
+Worker processes are reused between jobs, so per-process state (the Whisper
+engine memo, Drive credentials, the sprite cache) stays warm.
+
+If a worker dies (e.g. OOM-killed), ProcessPoolExecutor terminates the other
+workers too: every running job fails with BrokenProcessPool and is reported to
+on_crash, and a fresh pool serves the rest of the queue. app.py requeues those
+jobs until their task has used up its attempts.
+
+Environment:
+    RENDER_WORKERS          fixed worker count (default: derived from CPU/memory)
+    RENDER_CPUS_PER_JOB     cores budgeted per render (default 4)
+    RENDER_MEMORY_PER_JOB   bytes budgeted per render (default 3 GiB)
+    RENDER_QUEUE_DEPTH      jobs allowed to wait (default 16)
+
+Usage:
+    from render_queue import RenderQueue, QueueFull
+
+    queue = RenderQueue()
+    try:
+        queue.submit(task_id, generate_video_task, folder_id, title, task_id)
+    except QueueFull as e:
+        ...  # 429 with Retry-After: e.retry_after
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+CPUS_PER_JOB = int(os.environ.get("RENDER_CPUS_PER_JOB", "4"))
+MEMORY_PER_JOB = int(os.environ.get("RENDER_MEMORY_PER_JOB", 3 * 1024 * 1024 * 1024))
+DEFAULT_QUEUE_DEPTH = int(os.environ.get("RENDER_QUEUE_DEPTH", "16"))
+DEFAULT_JOB_SECONDS = 120  # Retry-After basis until a job has finished
+
+
+def physical_memory():
+    """Physical memory in bytes, or None when the platform doesn't say"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_worker_count():
+    """Concurrent renders this host can run without contending for CPU or memory"""
+    configured = os.environ.get("RENDER_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    count = (os.cpu_count() or 1) // CPUS_PER_JOB
+    memory = physical_memory()
+    if memory:
+        count = min(count, memory // MEMORY_PER_JOB)
+    return max(1, count)
+
+
+class QueueFull(Exception):
+    """Raised by RenderQueue.submit when no more jobs may wait"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Render queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RenderQueue:
+    """Priority/FIFO queue feeding a bounded pool of render processes"""
+
+    def __init__(self, workers=None, max_depth=DEFAULT_QUEUE_DEPTH, on_crash=None, on_finish=None):
+        self.workers = workers or default_worker_count()
+        self.max_depth = max_depth
+        # Called as on_crash(task_id, error) when a job ends with an exception. A
+        # worker dying breaks the whole pool, so every job running at that moment
+        # gets BrokenProcessPool, including those whose worker was fine.
+        self.on_crash = on_crash
+        self.on_finish = on_finish  # Called as on_finish(task_id) after every task
+        self._heap = []
+        self._seq = itertools.count()
+        self._active = {}
+        self._durations = deque(maxlen=20)
+        self._lock = threading.RLock()  # Done callbacks may run inside _dispatch
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def submit(self, task_id, fn, *args, priority=0):
+        """Queue fn(*args) for a worker; higher priority runs first"""
+        with self._lock:
+            if len(self._heap) >= self.max_depth:
+                raise QueueFull(self._retry_after())
+            heapq.heappush(self._heap, (-priority, next(self._seq), task_id, fn, args))
+            self._dispatch()
+
+    def _dispatch(self):
+        # Called with the lock held
+        while self._heap and len(self._active) < self.workers:
+            _, _, task_id, fn, args = heapq.heappop(self._heap)
+            pool = self._get_pool()
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self._pool = None
+                pool = self._get_pool()
+                future = pool.submit(fn, *args)
+            self._active[task_id] = future
+            started = time.monotonic()
+            future.add_done_callback(
+                lambda f, task_id=task_id, pool=pool, started=started: self._finished(task_id, pool, started, f)
+            )
+
+    def _finished(self, task_id, pool, started, future):
+        error = future.exception()
+        with self._lock:
+            self._active.pop(task_id, None)
+            if error is None:
+                self._durations.append(time.monotonic() - started)
+            elif isinstance(error, BrokenProcessPool) and self._pool is pool:
+                # A worker died (e.g. OOM-killed); start a fresh pool for the rest
+                pool.shutdown(wait=False)
+                self._pool = None
+            self._dispatch()
+        if error is not None and self.on_crash:
+            self.on_crash(task_id, error)
+        if self.on_finish:
+            self.on_finish(task_id)
+
+    def _retry_after(self):
+        average = sum(self._durations) / len(self._durations) if self._durations else DEFAULT_JOB_SECONDS
+        # Time for one waiting job to leave the queue
+        return max(1, int(average / self.workers + 0.5))
+
+    def position(self, task_id):
+        """1-based place of a waiting task in run order, or None if not waiting"""
+        with self._lock:
+            for place, entry in enumerate(sorted(self._heap), start=1):
+                if entry[2] == task_id:
+                    return place
+        return None
+
+    def worker_pids(self):
+        """PIDs of the live worker processes"""
+        with self._lock:
+            processes = getattr(self._pool, "_processes", None) or {}
+            return list(processes)
+
+    def is_running(self, task_id):
+        with self._lock:
+            return task_id in self._active
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "active": len(self._active),
+                "queued": len(self._heap),
+                "max_depth": self.max_depth,
+            }
@@ -0,0 +1,58 @@
+"""
+Render Style Selection for Video Generator
+==========================================
+
+Picks the "random" title font and caption style of a short from a seed, so
+the same request always resolves to the same look. This lets a render be
+cached and reproduced. The seed defaults to a hash of the folder id and
+title; callers can pass their own to get a different look for the same input.
+
+Usage:
+    from render_style import default_seed, resolve_render_style
+
+    style = resolve_render_style(default_seed(folder_id, title))
+    style["title_font"], style["caption_style"]
+"""
+
+import os
+import glob
+import random
+import hashlib
+
+SCARY_FONTS_FOLDER = "scary_fonts"
+FALLBACK_FONT = "Roboto-Bold.ttf"
+
+
+def default_seed(folder_id, title):
+    """Stable seed for a folder/title pair"""
+    return int(hashlib.sha256(f"{folder_id}\0{title}".encode()).hexdigest()[:12], 16)
+
+
+def select_random_font(rng, fonts_folder=SCARY_FONTS_FOLDER, fallback=FALLBACK_FONT):
+    """Select a font from fonts_folder with rng, or fallback if there is none"""
+    try:
+        # Sorted, so the same seed picks the same font on every host
+        font_files = sorted(glob.glob(os.path.join(fonts_folder, "*.ttf")))
+
+        if not font_files:
+            print(f"No .ttf files found in {fonts_folder} folder. Using fallback font.")
+            return fallback
+
+        selected_font = rng.choice(font_files)
+        print(f"Selected random font: {os.path.basename(selected_font)}")
+        return selected_font
+
+    except Exception as e:
+        print(f"Error selecting random font: {e}. Using fallback font.")
+        return fallback
+
+
+def resolve_render_style(seed):
+    """Title font and caption style index chosen by seed"""
+    from caption_styles import STYLE_NAMES
+
+    rng = random.Random(seed)
+    title_font = select_random_font(rng)
+    # Same draw as CaptionStyleManager.select_random_style(rng)
+    caption_style = rng.randint(0, len(STYLE_NAMES) - 1)
+    return {"seed": seed, "title_font": title_font, "caption_style": caption_style}
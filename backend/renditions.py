@@ -0,0 +1,196 @@
+"""
+Output Renditions for Video Generator
+=====================================
+
+Besides the 576x1024 short, a render can produce an upscaled 1080x1920
+upload master, a low-bitrate preview for the chat approval step and a JPEG
+thumbnail. All of them come out of one ffmpeg process: the composited frames
+are piped in once as raw RGB, split inside the filtergraph, and scaled and
+encoded per output. The thumbnail is one frame selected from the same stream,
+so the frames are only synthesized once per short. The ffmpeg render backend
+appends the same split (rendition_graph) to its own filtergraph.
+
+Renditions are written next to the main output file, e.g. for output.mp4:
+    output.mp4, output_master.mp4, output_preview.mp4, output_thumbnail.jpg
+
+Usage:
+    from renditions import parse_renditions, rendition_outputs, write_renditions
+
+    outputs = rendition_outputs(output_file, parse_renditions(["master", "thumbnail"]))
+    write_renditions(final_video, audio_path, outputs, thumbnail_time=2.0)
+"""
+
+import os
+import subprocess
+from collections import namedtuple
+
+import numpy as np
+
+Rendition = namedtuple("Rendition", ["name", "kind", "size", "suffix", "mimetype", "codec_args"])
+
+# In the order they are listed and encoded; "short" is the main output
+RENDITIONS = {
+    "short": Rendition(
+        "short", "video", (576, 1024), ".mp4", "video/mp4",
+        ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-c:a", "aac"]
+    ),
+    "master": Rendition(
+        "master", "video", (1080, 1920), "_master.mp4", "video/mp4",
+        ["-c:v", "libx264", "-preset", "medium", "-crf", "18", "-c:a", "aac", "-b:a", "192k"]
+    ),
+    "preview": Rendition(
+        "preview", "video", (360, 640), "_preview.mp4", "video/mp4",
+        ["-c:v", "libx264", "-preset", "veryfast", "-b:v", "300k", "-maxrate", "350k",
+         "-bufsize", "700k", "-c:a", "aac", "-b:a", "64k", "-ac", "1"]
+    ),
+    "thumbnail": Rendition(
+        "thumbnail", "image", (576, 1024), "_thumbnail.jpg", "image/jpeg",
+        ["-q:v", "2"]
+    ),
+}
+DEFAULT_RENDITIONS = ["short"]
+
+
+def parse_renditions(names):
+    """Validated rendition names in encode order, always including "short" """
+    if names is None:
+        return list(DEFAULT_RENDITIONS)
+    if not isinstance(names, (list, tuple)) or not all(isinstance(name, str) for name in names):
+        raise ValueError("'renditions' must be a list of names")
+    unknown = [name for name in names if name not in RENDITIONS]
+    if unknown:
+        raise ValueError(
+            f"Unknown rendition '{unknown[0]}', expected any of {', '.join(RENDITIONS)}"
+        )
+    return [name for name in RENDITIONS if name == "short" or name in names]
+
+
+def rendition_path(output_file, name):
+    """File a rendition of output_file is written to"""
+    return os.path.splitext(output_file)[0] + RENDITIONS[name].suffix
+
+
+def rendition_outputs(output_file, names):
+    """(Rendition, path) pairs for names"""
+    return [(RENDITIONS[name], rendition_path(output_file, name)) for name in names]
+
+
+def rendition_graph(source, outputs, source_size, video_filter=None, thumbnail_frame=0):
+    """Filtergraph chains fanning the stream labelled source out to [ro0], [ro1], ..."""
+    # The frames enter the graph once and are fanned out to every output
+    labels = "".join(f"[rs{i}]" for i in range(len(outputs)))
+    prefix = f"{video_filter}," if video_filter else ""
+    graph = [f"[{source}]{prefix}split={len(outputs)}{labels}"]
+    for i, (rendition, _) in enumerate(outputs):
+        filters = []
+        if rendition.kind == "image":
+            # Select before scaling so only the chosen frame is scaled
+            filters.append(f"select='eq(n,{thumbnail_frame})'")
+        if tuple(rendition.size) != tuple(source_size):
+            filters.append(f"scale={rendition.size[0]}:{rendition.size[1]}:flags=lanczos")
+        filters.append("setsar=1")
+        if rendition.kind == "video":
+            filters.append("format=yuv420p")
+        graph.append(f"[rs{i}]{','.join(filters)}[ro{i}]")
+    return graph
+
+
+def rendition_output_args(outputs, audio_stream, fps, duration):
+    """ffmpeg output options writing [ro0], [ro1], ... to each rendition's path"""
+    args = []
+    for i, (rendition, path) in enumerate(outputs):
+        args += ["-map", f"[ro{i}]"]
+        if rendition.kind == "image":
+            args += rendition.codec_args + ["-frames:v", "1", path]
+            continue
+        args += ["-map", audio_stream] + rendition.codec_args
+        args += [
+            "-r", str(fps),
+            "-t", f"{duration:.3f}",
+            "-movflags", "+faststart",  # moov atom first so playback can start early
+            path,
+        ]
+    return args
+
+
+def build_rendition_command(source_args, audio_args, audio_stream, outputs, source_size, fps,
+                            duration, video_filter=None, thumbnail_frame=0):
+    """ffmpeg command encoding input 0's video into every (Rendition, path) in outputs"""
+    args = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"] + source_args + audio_args
+    graph = rendition_graph("0:v", outputs, source_size, video_filter, thumbnail_frame)
+    args += ["-filter_complex", ";".join(graph)]
+    return args + rendition_output_args(outputs, audio_stream, fps, duration)
+
+
+class RenditionWriter:
+    """ffmpeg process fed raw RGB frames on stdin"""
+
+    def __init__(self, command):
+        self.command = command
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write_frame(self, frame):
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+        except BrokenPipeError:
+            # ffmpeg exited early; close() reports its exit status
+            self.close()
+            raise
+
+    def close(self):
+        if not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self.proc.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, self.command)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.proc.kill()
+            self.proc.wait()
+            return False
+        self.close()
+        return False
+
+
+def thumbnail_frame_index(thumbnail_time, fps, duration):
+    last_frame = max(0, int(duration * fps) - 1)
+    return min(last_frame, max(0, round((thumbnail_time or 0.0) * fps)))
+
+
+def write_renditions(clip, audio_path, outputs, fps=24, video_filter=None, thumbnail_time=0.0):
+    """Generate clip's frames once and encode them into every output"""
+    width, height = clip.size
+    source_args = [
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+        "-framerate", str(fps), "-i", "-",
+    ]
+    command = build_rendition_command(
+        source_args, ["-i", audio_path], "1:a", outputs, (width, height), fps, clip.duration,
+        video_filter=video_filter,
+        thumbnail_frame=thumbnail_frame_index(thumbnail_time, fps, clip.duration)
+    )
+    print(f"Encoding {len(outputs)} renditions from one frame pass: "
+          + ", ".join(rendition.name for rendition, _ in outputs))
+    with RenditionWriter(command) as writer:
+        for frame in clip.iter_frames(fps=fps, dtype="uint8"):
+            writer.write_frame(frame)
+    return [path for _, path in outputs]
+
+
+def transcode_renditions(input_file, outputs, source_size, duration, fps=24, thumbnail_time=0.0):
+    """Encode outputs from an already rendered file, decoding it once"""
+    command = build_rendition_command(
+        ["-i", input_file], [], "0:a", outputs, source_size, fps, duration,
+        thumbnail_frame=thumbnail_frame_index(thumbnail_time, fps, duration)
+    )
+    print(f"Encoding {len(outputs)} renditions from {os.path.basename(input_file)}: "
+          + ", ".join(rendition.name for rendition, _ in outputs))
+    subprocess.run(command, check=True)
+    return [path for _, path in outputs]
@@ -0,0 +1,142 @@
+"""
+Segment-Parallel Render Backend for Video Generator
+===================================================
+
+Splits the timeline at the still boundaries and renders each still's slice
+(blur in/out, title, and the captions that fall in it) in its own worker
+process with its own libx264 encoder. The video-only pieces are joined with
+ffmpeg's concat demuxer using stream copy, and the narration is muxed once
+at the end, so a short uses one core per still instead of a single Python
+frame loop.
+
+Slice boundaries are rounded to whole frames so the concatenated pieces line
+up with the audio. A caption word that straddles a boundary keeps its
+original timing in both slices, so fades look the same as in a single pass;
+in the later slice it starts before zero, and the ASS script resumes it
+mid-way instead of replaying its fade-in and letter reveal.
+
+Usage:
+    from segment_render import render_segments
+
+    render_segments(stills, title_path, audio_path, clip_duration,
+                    caption_words, caption_manager, output_file, work_dir)
+"""
+
+import os
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_WORKERS = int(os.environ.get("SEGMENT_RENDER_WORKERS", os.cpu_count() or 1))
+
+
+def segment_bounds(count, clip_duration, fps):
+    """(start, duration) of each still's slice, aligned to frame boundaries"""
+    frames = [round(i * clip_duration * fps) for i in range(count + 1)]
+    return [(frames[i] / fps, (frames[i + 1] - frames[i]) / fps) for i in range(count)]
+
+
+def slice_caption_words(caption_words, start, duration):
+    """Caption words overlapping [start, start + duration), shifted to slice time"""
+    end = start + duration
+    return [
+        caption._replace(start=caption.start - start)
+        for caption in caption_words
+        if caption.start < end and caption.start + caption.duration > start
+    ]
+
+
+def render_segment(still, title_overlay_path, duration, caption_words, target_resolution,
+                   custom_font, out_path, fps=24, preset="medium", crf=23,
+                   caption_mode="clips", threads=0):
+    """Worker: render and encode one still's slice (video only) to out_path"""
+    from moviepy.editor import ImageClip
+    from caption_styles import CaptionStyleManager
+    from transitions import blur_transition
+    from static_layers import StaticLayer
+    from caption_blitter import CaptionBlitClip
+    from ffmpeg_backend import ass_filter
+
+    caption_manager = CaptionStyleManager(target_resolution, custom_font)
+    bg_clip = ImageClip(still).set_duration(duration)
+    title_layer = StaticLayer.from_png(title_overlay_path)
+    video = blur_transition(bg_clip, overlays=[title_layer]).set_fps(fps)
+
+    ffmpeg_params = ["-crf", str(crf), "-threads", str(threads)]
+    if caption_mode == "ass":
+        ass_path = os.path.splitext(out_path)[0] + ".ass"
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write(caption_manager.build_ass_script(caption_words))
+        fonts_dir = os.path.dirname(os.path.abspath(custom_font))
+        ffmpeg_params += ["-vf", ass_filter(ass_path, fonts_dir)]
+    else:
+        video = CaptionBlitClip(video, caption_manager.create_caption_sprites(caption_words))
+
+    video.write_videofile(
+        out_path,
+        fps=fps,
+        codec="libx264",
+        audio=False,
+        preset=preset,
+        ffmpeg_params=ffmpeg_params,
+        logger=None
+    )
+    return out_path
+
+
+def concat_segments(segment_paths, audio_path, output_file, work_dir, duration):
+    """Join encoded segments by stream copy and mux the audio track once"""
+    list_path = os.path.join(work_dir, "segments.txt")
+    with open(list_path, "w") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", audio_path,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "copy",
+        "-c:a", "aac",
+        "-t", f"{duration:.3f}",
+        "-movflags", "+faststart",
+        output_file
+    ], check=True)
+    return output_file
+
+
+def render_segments(stills, title_overlay_path, audio_path, clip_duration, caption_words,
+                    caption_manager, output_file, work_dir, fps=24, preset="medium", crf=23,
+                    caption_mode="clips", workers=DEFAULT_WORKERS):
+    """Render one segment per still in parallel and join them into output_file"""
+    os.makedirs(work_dir, exist_ok=True)
+    bounds = segment_bounds(len(stills), clip_duration, fps)
+    workers = max(1, min(workers, len(stills)))
+    # Split the cores between the encoders running side by side
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    print(f"Rendering {len(stills)} segments on {workers} worker processes...")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = []
+        for i, (still, (start, duration)) in enumerate(zip(stills, bounds)):
+            futures.append(pool.submit(
+                render_segment,
+                still,
+                title_overlay_path,
+                duration,
+                slice_caption_words(caption_words, start, duration),
+                caption_manager.target_resolution,
+                caption_manager.custom_font,
+                os.path.join(work_dir, f"segment_{i:02d}.mp4"),
+                fps=fps,
+                preset=preset,
+                crf=crf,
+                caption_mode=caption_mode,
+                threads=threads
+            ))
+        segment_paths = [future.result() for future in futures]
+
+    total = bounds[-1][0] + bounds[-1][1]
+    return concat_segments(segment_paths, audio_path, output_file, work_dir, total)
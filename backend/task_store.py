@@ -0,0 +1,224 @@
+"""
+Task Store for Video Generator
+==============================
+
+SQLite table of render tasks: state, current stage, percent complete, stage
+timings, error, output path and the parameters needed to run the task again.
+
+The database runs in WAL mode, so the web process can serve /status reads
+while render workers write progress. Rows are looked up by primary key and
+the (state, created_at) index, so polling stays cheap. Each process and
+thread uses its own connection.
+
+States: queued -> processing -> done | error
+
+Usage:
+    from task_store import get_task_store
+
+    store = get_task_store()
+    store.create(task_id, params)
+    store.start(task_id)
+    store.progress(task_id, "transcribe", 40.0)
+    store.finish(task_id, output_path)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.environ.get("TASK_DB_PATH", os.path.join("tasks", "tasks.db"))
+MAX_ATTEMPTS = int(os.environ.get("TASK_MAX_ATTEMPTS", "3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id     TEXT PRIMARY KEY,
+    state       TEXT NOT NULL,
+    stage       TEXT,
+    percent     REAL NOT NULL DEFAULT 0,
+    timings     TEXT,
+    error       TEXT,
+    output_path TEXT,
+    params      TEXT NOT NULL,
+    priority    INTEGER NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    worker_pid  INTEGER,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    request_key TEXT,
+    render_key  TEXT,
+    batch_id    TEXT,
+    metrics     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, created_at);
+"""
+
+# Columns added after the first release, created on databases that lack them
+MIGRATIONS = {
+    "request_key": "ALTER TABLE tasks ADD COLUMN request_key TEXT",
+    "render_key": "ALTER TABLE tasks ADD COLUMN render_key TEXT",
+    "batch_id": "ALTER TABLE tasks ADD COLUMN batch_id TEXT",
+    "metrics": "ALTER TABLE tasks ADD COLUMN metrics TEXT",
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tasks_request_key ON tasks (request_key, state);
+CREATE INDEX IF NOT EXISTS idx_tasks_batch ON tasks (batch_id);
+"""
+
+# Columns returned to callers; params, timings and metrics are decoded from JSON
+_COLUMNS = ("task_id", "state", "stage", "percent", "timings", "error", "output_path",
+            "params", "priority", "attempts", "created_at", "updated_at", "request_key",
+            "render_key", "batch_id", "metrics")
+
+
+class TaskStore:
+    """Task rows in a WAL-mode SQLite database"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._migrate()
+
+    def _migrate(self):
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(statement)
+        conn.executescript(INDEXES)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; every statement below is a single-row write or a read
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_dict(row):
+        task = {column: row[column] for column in _COLUMNS}
+        task["params"] = json.loads(task["params"])
+        task["timings"] = json.loads(task["timings"]) if task["timings"] else None
+        task["metrics"] = json.loads(task["metrics"]) if task["metrics"] else None
+        return task
+
+    def _update(self, task_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        self._connect().execute(
+            f"UPDATE tasks SET {assignments} WHERE task_id = ?",
+            (*fields.values(), task_id)
+        )
+
+    def create(self, task_id, params, priority=0, request_key=None, batch_id=None):
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO tasks (task_id, state, params, priority, request_key, batch_id, "
+            "created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+            (task_id, json.dumps(params), priority, request_key, batch_id, now, now)
+        )
+
+    def find_active(self, request_key):
+        """Queued or processing task created for the same request, or None"""
+        row = self._connect().execute(
+            "SELECT * FROM tasks WHERE request_key = ? AND state IN ('queued', 'processing') "
+            "ORDER BY created_at LIMIT 1",
+            (request_key,)
+        ).fetchone()
+        return self._row_to_dict(row) if row is not None else None
+
+    def set_render_key(self, task_id, render_key):
+        self._update(task_id, render_key=render_key)
+
+    def delete(self, task_id):
+        self._connect().execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def start(self, task_id):
+        """Mark a task as picked up by this process"""
+        now = time.time()
+        self._connect().execute(
+            "UPDATE tasks SET state = 'processing', stage = NULL, percent = 0, error = NULL, "
+            "attempts = attempts + 1, worker_pid = ?, updated_at = ? WHERE task_id = ?",
+            (os.getpid(), now, task_id)
+        )
+
+    def progress(self, task_id, stage, percent, timings=None):
+        fields = {"stage": stage, "percent": round(percent, 1)}
+        if timings is not None:
+            fields["timings"] = json.dumps(timings)
+        self._update(task_id, **fields)
+
+    def finish(self, task_id, output_path, timings=None, metrics=None):
+        fields = {"state": "done", "stage": None, "percent": 100.0, "output_path": output_path}
+        if timings is not None:
+            fields["timings"] = json.dumps(timings)
+        if metrics is not None:
+            fields["metrics"] = json.dumps(metrics)
+        self._update(task_id, **fields)
+
+    def fail(self, task_id, error, timings=None, metrics=None):
+        fields = {"state": "error", "error": str(error)}
+        if timings is not None:
+            fields["timings"] = json.dumps(timings)
+        if metrics is not None:
+            fields["metrics"] = json.dumps(metrics)
+        self._update(task_id, **fields)
+
+    def requeue(self, task_id):
+        self._update(task_id, state="queued", stage=None, percent=0.0, worker_pid=None)
+
+    def get(self, task_id):
+        row = self._connect().execute(
+            "SELECT * FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row is not None else None
+
+    def get_many(self, task_ids):
+        """{task_id: task} for the ids that exist"""
+        task_ids = list(dict.fromkeys(task_ids))
+        tasks = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(task_ids), 500):
+            chunk = task_ids[i:i + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            for row in self._connect().execute(
+                f"SELECT * FROM tasks WHERE task_id IN ({placeholders})", chunk
+            ):
+                tasks[row["task_id"]] = self._row_to_dict(row)
+        return tasks
+
+    def batch_tasks(self, batch_id):
+        """Tasks created by one /start_batch call, in submission order"""
+        rows = self._connect().execute(
+            "SELECT * FROM tasks WHERE batch_id = ? ORDER BY created_at, rowid", (batch_id,)
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def unfinished(self):
+        """Queued and processing tasks, oldest first"""
+        rows = self._connect().execute(
+            "SELECT * FROM tasks WHERE state IN ('queued', 'processing') ORDER BY created_at"
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_task_store():
+    """Process-wide TaskStore"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TaskStore()
+        return _store
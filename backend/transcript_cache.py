@@ -0,0 +1,123 @@
+"""
+Transcript Cache for Video Generator
+====================================
+
+Re-renders of the same narration (title change, image retry) used to run
+Whisper on identical audio again. Transcripts are stored on disk keyed by a
+hash of the audio content, the model name and the transcription options, so a
+repeat render gets its segments back immediately.
+
+Entries are JSON files. Entries are dropped max_age seconds after they were
+written (the created_at stored in the entry, so frequent hits do not keep an
+entry alive forever), and the least recently used ones (by mtime, refreshed
+on every hit) are evicted once the directory grows past max_bytes.
+
+Usage:
+    from transcript_cache import TranscriptCache, hash_file
+
+    cache = TranscriptCache()
+    audio_hash = hash_file(audio_path)
+    segments = cache.get(audio_hash, "base")
+    if segments is None:
+        segments = transcribe(audio_path)
+        cache.put(audio_hash, "base", segments)
+"""
+
+import os
+import json
+import time
+import hashlib
+
+from lru_eviction import evict_lru
+
+DEFAULT_CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR", "transcript_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("TRANSCRIPT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+DEFAULT_MAX_AGE = int(os.environ.get("TRANSCRIPT_CACHE_MAX_AGE", 30 * 24 * 3600))
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """Persistent store of Whisper segments keyed by audio hash, model and options"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(audio_hash, model_name, options=None):
+        payload = json.dumps([audio_hash, model_name, options or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def _created_at(entry, path):
+        # Entries written before created_at was stored fall back to their mtime
+        created_at = entry.get("created_at")
+        return created_at if created_at is not None else os.path.getmtime(path)
+
+    def get(self, audio_hash, model_name, options=None):
+        """Return cached segments, or None on a miss"""
+        path = self._path(self.make_key(audio_hash, model_name, options))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if time.time() - self._created_at(entry, path) > self.max_age:
+                os.remove(path)
+                return None
+            segments = entry["segments"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        # Touch on hit so eviction is least-recently-used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return segments
+
+    def put(self, audio_hash, model_name, segments, options=None):
+        """Store segments and trim the cache back under its limits"""
+        path = self._path(self.make_key(audio_hash, model_name, options))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "audio_hash": audio_hash,
+                "model": model_name,
+                "options": options or {},
+                "created_at": time.time(),
+                "segments": segments,
+            }, f, default=float)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def _expired(self, path, stat, now):
+        # mtime is never earlier than created_at, so an old mtime needs no read
+        if now - stat.st_mtime > self.max_age:
+            return True
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return now - self._created_at(entry, path) > self.max_age
+        except (OSError, ValueError, AttributeError, TypeError):
+            return False
+
+    def evict(self):
+        """Drop expired entries, then the least recently used until under max_bytes"""
+        now = time.time()
+        evict_lru(
+            self.cache_dir, self.max_bytes,
+            skip=lambda name: not name.endswith(".json"),
+            expired=lambda path, stat: self._expired(path, stat, now)
+        )
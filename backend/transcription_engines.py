@@ -0,0 +1,126 @@
+"""
+Transcription Engines for Video Generator
+=========================================
+
+Interchangeable speech-to-text backends behind one small interface, selected
+with an "engine:model" spec such as "whisper:base" or "whisper-int8:small".
+
+Engines Available:
+1. whisper      - openai-whisper in fp32 on CPU (the original behaviour)
+2. whisper-int8 - the same model with its Linear layers dynamically quantized
+                  to int8 by torch, which is noticeably faster on CPU
+
+Model sizes: tiny, base, small
+
+Usage:
+    from transcription_engines import get_engine
+
+    engine = get_engine("whisper-int8:base")
+    segments = engine.transcribe(audio_path)
+"""
+
+import os
+
+from metrics import timed
+
+MODEL_SIZES = ("tiny", "base", "small")
+DEFAULT_ENGINE = os.environ.get("TRANSCRIBE_ENGINE", "whisper:base")
+
+
+class TranscriptionEngine:
+    """Base class: loads a model once and turns audio files into Whisper-style segments"""
+
+    name = None
+
+    def __init__(self, model_name="base"):
+        if model_name not in MODEL_SIZES:
+            raise ValueError(f"Unknown model '{model_name}', expected one of {', '.join(MODEL_SIZES)}")
+        self.model_name = model_name
+        self.model = None
+
+    @property
+    def spec(self):
+        """Identifier used for cache keys and service requests"""
+        return f"{self.name}:{self.model_name}"
+
+    def load(self):
+        """Load the model if it is not resident yet and return the engine"""
+        if self.model is None:
+            self.model = self._load_model()
+        return self
+
+    def _load_model(self):
+        raise NotImplementedError
+
+    def transcribe(self, audio_path, **options):
+        """Return a list of segments with at least 'start', 'end' and 'text'"""
+        raise NotImplementedError
+
+
+class WhisperEngine(TranscriptionEngine):
+    """openai-whisper, fp32 on CPU"""
+
+    name = "whisper"
+
+    def _load_model(self):
+        import whisper
+        return whisper.load_model(self.model_name, device="cpu")
+
+    def transcribe(self, audio_path, **options):
+        self.load()
+        options.setdefault("fp16", False)
+        return self.model.transcribe(audio_path, **options)["segments"]
+
+
+class QuantizedWhisperEngine(WhisperEngine):
+    """openai-whisper with int8 dynamically quantized Linear layers"""
+
+    name = "whisper-int8"
+
+    def _load_model(self):
+        import torch
+        import whisper
+
+        model = whisper.load_model(self.model_name, device="cpu")
+        # whisper.model.Linear only adds a dtype cast that is a no-op in fp32;
+        # quantize_dynamic only swaps plain nn.Linear modules
+        for module in model.modules():
+            if isinstance(module, whisper.model.Linear):
+                module.__class__ = torch.nn.Linear
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    QuantizedWhisperEngine.name: QuantizedWhisperEngine,
+}
+
+
+def parse_engine_spec(spec):
+    """Split and validate an "engine:model" spec, e.g. "whisper-int8:small" """
+    engine_name, _, model_name = spec.partition(":")
+    model_name = model_name or "base"
+    if engine_name not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine_name}', expected one of {', '.join(ENGINES)}")
+    if model_name not in MODEL_SIZES:
+        raise ValueError(f"Unknown model '{model_name}', expected one of {', '.join(MODEL_SIZES)}")
+    return engine_name, model_name
+
+
+def create_engine(spec=DEFAULT_ENGINE):
+    """Create a new, not yet loaded engine for spec"""
+    engine_name, model_name = parse_engine_spec(spec)
+    return ENGINES[engine_name](model_name)
+
+
+_engines = {}
+
+
+def get_engine(spec=DEFAULT_ENGINE):
+    """Process-wide engine for spec, loaded on first use"""
+    engine_name, model_name = parse_engine_spec(spec)
+    key = f"{engine_name}:{model_name}"
+    if key not in _engines:
+        with timed("whisper_load"):
+            _engines[key] = create_engine(key).load()
+    return _engines[key]
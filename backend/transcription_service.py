@@ -0,0 +1,218 @@
+"""
+Transcription Service for Video Generator
+=========================================
+
+Long-lived local Whisper worker so render tasks do not each import torch, read
+the weights from disk and hold their own copy of the model.
+
+The service listens on a loopback socket (multiprocessing.connection). Messages
+are pickles, so the socket is protected by an authkey: TRANSCRIBE_AUTHKEY, or a
+random key generated on first run and kept in TRANSCRIBE_AUTHKEY_FILE (mode
+0600), which every process on the host that may use the service reads.
+
+A small pool of worker threads, each with its own resident engine (see
+transcription_engines), pulls requests off one queue. When several tasks are
+waiting, a worker takes all of them at once and transcribes each distinct
+audio file a single time, answering every waiter with the same segments.
+
+Usage:
+    # server, started once per host (app.py does this on startup)
+    python transcription_service.py --engine whisper-int8:base --workers 2
+
+    # client, from a render task
+    from transcription_service import transcribe_via_service
+    segments = transcribe_via_service(audio_path)
+"""
+
+import os
+import queue
+import secrets
+import ipaddress
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+
+from transcription_engines import DEFAULT_ENGINE, create_engine, parse_engine_spec
+
+SERVICE_ADDRESS = (
+    os.environ.get("TRANSCRIBE_HOST", "127.0.0.1"),
+    int(os.environ.get("TRANSCRIBE_PORT", "6011"))
+)
+AUTHKEY_FILE = os.environ.get("TRANSCRIBE_AUTHKEY_FILE", "transcribe_authkey")
+REQUEST_TIMEOUT = float(os.environ.get("TRANSCRIBE_TIMEOUT", "900"))
+DEFAULT_WORKERS = int(os.environ.get(
+    "TRANSCRIBE_WORKERS", max(1, min(4, (os.cpu_count() or 1) // 4))
+))
+
+
+def service_authkey(path=AUTHKEY_FILE):
+    """TRANSCRIBE_AUTHKEY, or the host's key file, created with a random key if missing"""
+    key = os.environ.get("TRANSCRIBE_AUTHKEY")
+    if key:
+        return key.encode()
+    # Written in full to a private temp file, then linked into place, so a
+    # concurrent reader sees either no key file or the whole key
+    key = secrets.token_hex(32).encode()
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        os.link(tmp_path, path)  # Fails if another process got there first
+        return key
+    except FileExistsError:
+        with open(path, "rb") as f:
+            key = f.read().strip()
+        if not key:
+            raise RuntimeError(f"Transcription authkey file {path} is empty")
+        return key
+    finally:
+        os.remove(tmp_path)
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class TranscriptionServer:
+    """Keeps Whisper models resident and answers transcription requests"""
+
+    def __init__(self, engine_spec=DEFAULT_ENGINE, workers=DEFAULT_WORKERS,
+                 address=SERVICE_ADDRESS, authkey=None):
+        if not is_loopback(address[0]):
+            # Anyone who can reach the socket and knows the key can run code here
+            raise ValueError(f"Transcription service must bind to a loopback address, not {address[0]}")
+        self.engine_spec = engine_spec
+        self.workers = max(1, workers)
+        self.address = address
+        self.authkey = authkey or service_authkey()
+        self._requests = queue.Queue()
+
+    def _next_batch(self):
+        """Block for one request, then take everything else already waiting"""
+        batch = [self._requests.get()]
+        while True:
+            try:
+                batch.append(self._requests.get_nowait())
+            except queue.Empty:
+                return batch
+
+    @staticmethod
+    def _reply(conn, message):
+        try:
+            conn.send(message)
+        except (OSError, EOFError):
+            pass  # Client went away, nothing to do
+        finally:
+            conn.close()
+
+    def _worker(self):
+        # Each worker owns its engines: whisper installs per-call hooks on the model
+        engines = {}
+        try:
+            engines[self.engine_spec] = create_engine(self.engine_spec).load()
+            print(f"Transcription worker ready ({self.engine_spec})")
+        except Exception as e:
+            # Keep answering; each request retries the load and gets the error back
+            print(f"Transcription worker could not load {self.engine_spec}: {e}")
+        while True:
+            batch = self._next_batch()
+
+            # Identical requests waiting together are transcribed once
+            groups = {}
+            for request, conn in batch:
+                key = (
+                    request.get("engine") or self.engine_spec,
+                    request["audio_path"],
+                    tuple(sorted(request.get("options", {}).items()))
+                )
+                groups.setdefault(key, []).append(conn)
+
+            for (engine_spec, audio_path, options), waiters in groups.items():
+                try:
+                    engine = engines.get(engine_spec)
+                    if engine is None:
+                        parse_engine_spec(engine_spec)
+                        engine = engines[engine_spec] = create_engine(engine_spec).load()
+                    message = {"segments": engine.transcribe(audio_path, **dict(options))}
+                except Exception as e:
+                    message = {"error": str(e)}
+                for conn in waiters:
+                    self._reply(conn, message)
+
+    def _accept(self, conn):
+        try:
+            request = conn.recv()
+        except (OSError, EOFError):
+            conn.close()
+            return
+        self._requests.put((request, conn))
+
+    def serve_forever(self):
+        try:
+            import torch
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // self.workers))
+        except ImportError:
+            pass
+
+        for _ in range(self.workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"Transcription service listening on {self.address[0]}:{self.address[1]}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError):
+                    continue  # Failed handshake, keep serving
+                threading.Thread(target=self._accept, args=(conn,), daemon=True).start()
+
+
+def run_server(engine_spec=DEFAULT_ENGINE, workers=DEFAULT_WORKERS):
+    TranscriptionServer(engine_spec, workers).serve_forever()
+
+
+def start_transcription_service(engine_spec=DEFAULT_ENGINE, workers=DEFAULT_WORKERS):
+    """Start the service in a background process and return it"""
+    process = multiprocessing.Process(
+        target=run_server, args=(engine_spec, workers), daemon=True, name="transcription-service"
+    )
+    process.start()
+    return process
+
+
+def transcribe_via_service(audio_path, engine_spec=None, options=None,
+                           address=SERVICE_ADDRESS, authkey=None, timeout=REQUEST_TIMEOUT):
+    """
+    Transcribe through the local service and return Whisper segments.
+    Raises ConnectionRefusedError (an OSError) when no service is running and
+    TimeoutError (also an OSError) when it does not answer within timeout.
+    """
+    with Client(address, authkey=authkey or service_authkey()) as conn:
+        conn.send({
+            "audio_path": os.path.abspath(audio_path),
+            "engine": engine_spec,
+            "options": options or {}
+        })
+        if not conn.poll(timeout):
+            raise TimeoutError(f"Transcription service did not answer within {timeout:.0f}s")
+        reply = conn.recv()
+    if "error" in reply:
+        raise RuntimeError(f"Transcription service failed: {reply['error']}")
+    return reply["segments"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the local Whisper transcription service")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, help="engine:model, e.g. whisper-int8:base")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    parse_engine_spec(args.engine)
+    run_server(args.engine, args.workers)
@@ -0,0 +1,73 @@
+"""
+Transitions Module for Video Generator
+======================================
+
+Blur in/out transition for the still image clips.
+
+The blur radius only depends on how far a frame is from the start or end of
+its clip, and is truncated to an integer, so a still never has more than
+max_radius + 1 distinct looks. BlurTransition renders each of those levels once
+and serves every frame from that cache; frames in the static middle stretch get
+the original still array back with no copy.
+
+Static overlays (the title, see static_layers) are baked into each level as
+it is rendered, on top of the blur, so the frame loop needs no composite for
+them; the middle stretch then gets one baked copy of the still.
+
+Usage:
+    from transitions import blur_transition
+
+    clip = blur_transition(ImageClip(still).set_duration(clip_duration), overlays=[title_layer])
+"""
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from static_layers import bake_layers
+
+
+class BlurTransition:
+    """Caches the blurred versions of one still for the fade in/out"""
+
+    def __init__(self, still, duration, blur_duration=1.0, max_radius=20, overlays=()):
+        self.still = still
+        self.duration = duration
+        self.blur_duration = blur_duration
+        self.max_radius = max_radius
+        self.overlays = list(overlays)
+        self._levels = {0: bake_layers(still, self.overlays)}
+
+    def radius_at(self, t):
+        """Blur radius used for the frame at time t"""
+        alpha = 1.0
+        if t < self.blur_duration:
+            alpha = t / self.blur_duration
+        elif t > self.duration - self.blur_duration:
+            alpha = (self.duration - t) / self.blur_duration
+        return min(self.max_radius, max(0, int(self.max_radius * (1 - alpha))))
+
+    def level(self, radius):
+        """Return the still blurred with the given radius, rendering it once"""
+        frame = self._levels.get(radius)
+        if frame is None:
+            pil_frame = Image.fromarray(self.still).filter(ImageFilter.GaussianBlur(radius))
+            frame = np.array(pil_frame)
+            for overlay in self.overlays:
+                overlay.bake_into(frame)
+            self._levels[radius] = frame
+        return frame
+
+    def precompute(self):
+        """Render every blur level up front instead of on first use"""
+        for radius in range(1, self.max_radius + 1):
+            self.level(radius)
+        return self
+
+    def frame_at(self, t):
+        return self.level(self.radius_at(t))
+
+
+def blur_transition(clip, blur_duration=1.0, max_radius=20, overlays=()):
+    """Apply the cached blur in/out transition, with static overlays baked in, to a still image clip"""
+    transition = BlurTransition(clip.get_frame(0), clip.duration, blur_duration, max_radius, overlays)
+    return clip.fl(lambda gf, t: transition.frame_at(t))
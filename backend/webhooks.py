@@ -0,0 +1,158 @@
+"""
+Completion Webhooks for Video Generator
+=======================================
+
+POSTs a task's final status as JSON to the callback_url given to /start.
+Delivery runs on a background thread and retries connection errors, timeouts,
+429 and 5xx responses with exponential backoff, up to a fixed number of
+attempts. Other 4xx responses are not retried.
+
+Callback URLs are user input, so the server must not be usable to reach
+itself or the internal network: a URL is only accepted if every address its
+host resolves to is public (not loopback, private, link-local, reserved or
+multicast). It is checked when /start accepts it and again before each
+delivery, and the delivery connects to the address that was checked (sending
+the original Host header, and verifying TLS against the original name), so
+the name cannot be re-resolved to an internal address in between. Redirects
+are not followed, and only a 2xx counts as delivered. Hosts listed in
+CALLBACK_ALLOWED_HOSTS (comma-separated, e.g. an n8n instance on the LAN) skip
+the address check.
+
+Usage:
+    from webhooks import send_callback
+
+    send_callback("https://n8n.example.com/webhook/render-done", payload)
+"""
+
+import os
+import time
+import socket
+import ipaddress
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CALLBACK_ATTEMPTS = int(os.environ.get("CALLBACK_ATTEMPTS", "5"))
+CALLBACK_BACKOFF = float(os.environ.get("CALLBACK_BACKOFF", "2"))
+CALLBACK_TIMEOUT = 10
+CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.environ.get("CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+}
+
+
+def public_address(host):
+    """An address of host if every address it resolves to is publicly routable, else None"""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except (socket.gaierror, UnicodeError):
+        return None
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            return None
+    return str(ipaddress.ip_address(infos[0][4][0].split("%")[0])) if infos else None
+
+
+def is_public_host(host):
+    """True if every address host resolves to is publicly routable"""
+    return public_address(host) is not None
+
+
+def parse_callback_url(url):
+    """urlparse result of a well-formed http(s) URL with a host, else None"""
+    try:
+        parsed = urlparse(url)
+        parsed.port  # Raises ValueError on a malformed port
+    except ValueError:
+        return None
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return None
+    return parsed
+
+
+def is_valid_callback_url(url):
+    parsed = parse_callback_url(url)
+    if parsed is None:
+        return False
+    if parsed.hostname.lower() in CALLBACK_ALLOWED_HOSTS:
+        return True
+    return is_public_host(parsed.hostname)
+
+
+class PinnedHostAdapter(HTTPAdapter):
+    """HTTPS to an IP address, with SNI and certificate checks for the original host name"""
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["server_hostname"] = self.hostname
+        kwargs["assert_hostname"] = self.hostname
+        super().init_poolmanager(*args, **kwargs)
+
+
+def post_callback(url, payload, timeout=CALLBACK_TIMEOUT):
+    """POST payload to url's checked address; None if the host is not public or allowed"""
+    parsed = parse_callback_url(url)
+    if parsed is None:
+        return None
+    if parsed.hostname.lower() in CALLBACK_ALLOWED_HOSTS:
+        return requests.post(url, json=payload, timeout=timeout, allow_redirects=False)
+
+    # Connect to the address that passed the check; letting requests resolve
+    # the name again would allow it to be re-pointed in between
+    address = public_address(parsed.hostname)
+    if address is None:
+        return None
+    userinfo, _, host_port = parsed.netloc.rpartition("@")
+    netloc = f"[{address}]" if ":" in address else address
+    if parsed.port:
+        netloc += f":{parsed.port}"
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+    with requests.Session() as session:
+        if parsed.scheme == "https":
+            session.mount("https://", PinnedHostAdapter(parsed.hostname))
+        return session.post(
+            parsed._replace(netloc=netloc).geturl(), json=payload, headers={"Host": host_port},
+            timeout=timeout, allow_redirects=False
+        )
+
+
+def deliver_callback(url, payload, attempts=CALLBACK_ATTEMPTS, backoff=CALLBACK_BACKOFF,
+                     timeout=CALLBACK_TIMEOUT):
+    """POST payload to url, retrying transient failures; returns True on a 2xx"""
+    for attempt in range(attempts):
+        try:
+            # Re-checked each time: the host may resolve elsewhere than at /start
+            response = post_callback(url, payload, timeout)
+            if response is None:
+                print(f"Callback to {url} refused: host is not public or allowed")
+                return False
+            if 200 <= response.status_code < 300:
+                return True
+            if response.status_code != 429 and response.status_code < 500:
+                print(f"Callback to {url} rejected with HTTP {response.status_code}")
+                return False
+            reason = f"HTTP {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            reason = str(e)
+
+        if attempt < attempts - 1:
+            delay = backoff * (2 ** attempt)
+            print(f"Callback to {url} failed ({reason}), retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+    print(f"Giving up on callback to {url} after {attempts} attempts")
+    return False
+
+
+def send_callback(url, payload):
+    """Deliver a callback without blocking the caller"""
+    thread = threading.Thread(target=deliver_callback, args=(url, payload), daemon=True,
+                              name="task-callback")
+    thread.start()
+    return thread